@@ -0,0 +1,281 @@
+import asyncio
+from collections import deque
+from datetime import timedelta
+from functools import partial
+from io import BytesIO
+import os
+from pytz import timezone
+from zipfile import BadZipfile, ZipFile
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from pyoasis.repeat_calls import (
+    check_chunk_errors,
+    chunk_dataframes,
+    chunk_windows,
+    stitch_report_dataframes,
+    with_required_columns,
+)
+from pyoasis.report import OASISReport
+from pyoasis.utils import OASIS_BASE_URL, create_oasis_url, open_zip_members
+
+
+def _require_aiohttp():
+    """
+    Raises ImportError if the optional aiohttp dependency is missing.
+    """
+    if aiohttp is None:
+        raise ImportError(
+            "pyoasis.async_calls requires aiohttp: pip install pyoasis[async]"
+        )
+
+
+async def download_zipfile_async(session, url, max_attempts=1, semaphore=None):
+    """
+    Async counterpart of pyoasis.utils.download_zipfile. Downloads a zipped
+    response from url and returns it as an in-memory ZipFile.
+
+    :param session: aiohttp.ClientSession
+    :param url: (string)
+    :param max_attempts: maximum attempts to download file (int)
+    :param semaphore: asyncio.Semaphore limiting requests in flight
+    :return: ZipFile
+    """
+    i = 1
+    while True:
+        if semaphore:
+            async with semaphore:
+                async with session.get(url) as response:
+                    content = await response.read()
+        else:
+            async with session.get(url) as response:
+                content = await response.read()
+        try:
+            return ZipFile(BytesIO(content))
+        except BadZipfile as e:
+            if i < max_attempts:
+                await asyncio.sleep(i)
+                i += 1
+            else:
+                raise e
+
+
+async def download_files_async(
+    session, url, destination_directory, max_attempts=1, semaphore=None
+):
+    """
+    Async counterpart of pyoasis.utils.download_files. Downloads zipped files
+    from url and saves to destination_directory.
+
+    :param session: aiohttp.ClientSession
+    :param url: (string)
+    :param destination_directory: (string)
+    :param max_attempts: maximum attempts to download file (int)
+    :param semaphore: asyncio.Semaphore limiting requests in flight
+    :return: absolute paths of all files (list of strings)
+    """
+    destination_directory = os.path.abspath(os.path.expanduser(destination_directory))
+
+    zipfile = await download_zipfile_async(session, url, max_attempts, semaphore)
+    await asyncio.get_running_loop().run_in_executor(
+        None, zipfile.extractall, destination_directory
+    )
+
+    return [destination_directory + "/" + x for x in zipfile.namelist()]
+
+
+def _parse_zipfile(zipfile, parser, typed=False, filters=None, columns=None):
+    """
+    Parses every member of zipfile and returns the OASISReports.
+    """
+    return [
+        OASISReport(x, parser=parser, typed=typed, filters=filters, columns=columns)
+        for x in open_zip_members(zipfile)
+    ]
+
+
+async def iter_report_chunks_async(
+    report_name,
+    start,
+    end_limit,
+    query_params,
+    chunk_size=timedelta(days=1),
+    max_attempts=10,
+    timezone_=timezone("US/Pacific"),
+    parser="xmltodict",
+    typed=False,
+    filters=None,
+    columns=None,
+    max_concurrency=4,
+    session=None,
+    semaphore=None,
+    base_url=OASIS_BASE_URL,
+):
+    """
+    Async generator over the chunk windows of a report. Up to max_concurrency
+    windows are downloaded ahead of the consumer and parsed in the default
+    executor, so the event loop is never blocked by XML parsing. Chunks are
+    yielded in time order.
+
+    :param report_name: see pyoasis.utils.get_report_names()
+    :param start: datetime
+    :param end_limit: datetime
+    :param query_params: see pyoasis.utils.get_report_params()
+    :param chunk_size: length of report to request (timedelta)
+    :param max_attempts: number of back-off attempts (int)
+    :param timezone_: pytz.timezone object used for naive start and
+        end_limit datetime objects
+    :param parser: OASISReport parser ("xmltodict" or "iterparse")
+    :param typed: True to parse columns to the report's typed schema
+    :param filters: row filters applied while parsing, see OASISReport
+    :param columns: list of DATA columns to keep, or None for all
+    :param max_concurrency: number of windows fetched ahead (int)
+    :param session: aiohttp.ClientSession, created for the call if None
+    :param semaphore: asyncio.Semaphore shared with other queries to cap the
+        total number of requests in flight, created for the call if None
+    :param base_url: scheme and host to send the queries to
+    :return: async generator of (chunk_start, chunk_end, list of OASISReport)
+    """
+    _require_aiohttp()
+
+    # localize naive datetime
+    if not start.tzinfo:
+        start = timezone_.localize(start)
+    if not end_limit.tzinfo:
+        end_limit = timezone_.localize(end_limit)
+
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession()
+
+    loop = asyncio.get_running_loop()
+
+    async def fetch_window(chunk_start, chunk_end):
+        url = create_oasis_url(
+            report_name=report_name,
+            start=chunk_start,
+            end=chunk_end,
+            query_params=query_params,
+            base_url=base_url,
+        )
+        zipfile = await download_zipfile_async(
+            session, url, max_attempts=max_attempts, semaphore=semaphore
+        )
+        oasis_reports = await loop.run_in_executor(
+            None, partial(_parse_zipfile, zipfile, parser, typed, filters, columns)
+        )
+        return chunk_start, chunk_end, oasis_reports
+
+    windows = chunk_windows(start, end_limit, chunk_size)
+    pending = deque()
+    try:
+        for window in windows:
+            pending.append(asyncio.ensure_future(fetch_window(*window)))
+            if len(pending) >= max_concurrency:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+        if own_session:
+            await session.close()
+
+
+async def fetch_report_async(
+    report_name,
+    start,
+    end_limit,
+    query_params,
+    chunk_size=timedelta(days=1),
+    max_attempts=10,
+    timezone_=timezone("US/Pacific"),
+    start_column="INTERVAL_START_GMT",
+    end_column="INTERVAL_END_GMT",
+    sort_by=["DATA_ITEM", "INTERVAL_START_GMT"],
+    parser="xmltodict",
+    typed=False,
+    filters=None,
+    columns=None,
+    max_concurrency=4,
+    session=None,
+    semaphore=None,
+    base_url=OASIS_BASE_URL,
+):
+    """
+    Async counterpart of pyoasis.repeat_calls.fetch_report. Fetches reports
+    from OASIS and stitches them together into a single report beginning on
+    start and ending on end_limit. The report is returned as a DataFrame
+    rather than written to CSV.
+
+    Several reports can be fetched side by side on one event loop, e.g. with
+    asyncio.gather, sharing a session and a semaphore to cap the total number
+    of requests in flight.
+
+    :param report_name: see pyoasis.utils.get_report_names()
+    :param start: datetime
+    :param end_limit: datetime
+    :param query_params: see pyoasis.utils.get_report_params()
+    :param chunk_size: length of report to request (timedelta)
+    :param max_attempts: number of back-off attempts (int)
+    :param timezone_: pytz.timezone object used for naive start and
+        end_limit datetime objects
+    :param start_column: column name of start timestamps
+    :param end_column: column name of end timestamps
+    :param sort_by: sort order of resultant dataframe
+    :param parser: OASISReport parser ("xmltodict" or "iterparse")
+    :param typed: True to parse columns to the report's typed schema
+    :param filters: row filters applied while parsing, see OASISReport
+    :param columns: list of DATA columns to keep, or None for all
+    :param max_concurrency: number of windows fetched ahead (int)
+    :param session: aiohttp.ClientSession, created for the call if None
+    :param semaphore: asyncio.Semaphore shared with other queries
+    :param base_url: scheme and host to send the queries to
+    :return: DataFrame, empty when no window holds rows
+    :raises pyoasis.repeat_calls.OASISError: for a window answered with an
+        ERROR other than no data, as fetch_report
+    """
+    # localize naive datetime
+    if not start.tzinfo:
+        start = timezone_.localize(start)
+    if not end_limit.tzinfo:
+        end_limit = timezone_.localize(end_limit)
+
+    # columns needed to trim and sort the chunks
+    columns = with_required_columns(columns, [start_column, end_column] + sort_by)
+
+    report_dataframes = []
+    async for _, _, oasis_reports in iter_report_chunks_async(
+        report_name=report_name,
+        start=start,
+        end_limit=end_limit,
+        query_params=query_params,
+        chunk_size=chunk_size,
+        max_attempts=max_attempts,
+        timezone_=timezone_,
+        parser=parser,
+        typed=typed,
+        filters=filters,
+        columns=columns,
+        max_concurrency=max_concurrency,
+        session=session,
+        semaphore=semaphore,
+        base_url=base_url,
+    ):
+        check_chunk_errors(oasis_reports)
+        report_dataframes += chunk_dataframes(oasis_reports)
+
+    return stitch_report_dataframes(
+        report_dataframes=report_dataframes,
+        start=start,
+        end_limit=end_limit,
+        start_column=start_column,
+        end_column=end_column,
+        sort_by=sort_by,
+    )
@@ -0,0 +1,231 @@
+"""
+Benchmarks of the parse, filter and fetch paths on synthetic OASIS reports,
+reporting time and peak memory per stage, e.g.:
+
+    python -m pyoasis.benchmark --rows 1000 100000 1000000 --output bench.csv
+"""
+
+import argparse
+from datetime import timedelta
+import gc
+import os
+import pandas as pd
+import tempfile
+import time
+import tracemalloc
+
+from pyoasis.cache import ChunkCache
+from pyoasis.repeat_calls import chunk_windows, fetch_report
+from pyoasis.report import OASISReport
+from pyoasis.synthetic import (
+    SYNTHETIC_START,
+    synthetic_shape,
+    synthetic_zip_bytes,
+    write_synthetic_xml,
+)
+from pyoasis.utils import create_oasis_url, xml_to_dict
+
+# report sizes in rows, from 1k to several million
+SIZES = [1000, 10000, 100000, 1000000, 5000000]
+
+STAGES = [
+    "xml_to_dict",
+    "normalize_report_dict",
+    "to_dataframe",
+    "filter_report_dict",
+    "query",
+    "to_xml",
+    "write_xml",
+    "iterparse",
+    "fetch_report",
+]
+
+# windows fetch_report is benchmarked over
+FETCH_WINDOWS = 4
+
+BENCHMARK_QUERY_PARAMS = {"market_run_id": "DAM", "version": 1}
+
+
+def measure(function, setup=None, memory=True):
+    """
+    Times function(*setup()) and, when memory is True, measures its peak
+    memory allocations in a second run with tracemalloc, which slows
+    execution down too much to time the same run. setup is not measured.
+
+    :param function: function to measure
+    :param setup: function returning the arguments of function, or None
+    :param memory: True to measure peak memory
+    :return: (seconds, peak bytes or None)
+    """
+    arguments = setup() if setup else ()
+    gc.collect()
+    start = time.perf_counter()
+    function(*arguments)
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        arguments = setup() if setup else ()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function(*arguments)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return seconds, peak
+
+
+def report_stages(xml_path, node="NODE_0-APND"):
+    """
+    Returns the stages of parsing, filtering and writing an OASISReport as a
+    dictionary of stage name to (function, setup), see measure.
+
+    :param xml_path: path of a synthetic report
+    :param node: RESOURCE_NAME to filter on
+    """
+
+    def parsed_report():
+        return (OASISReport(xml_path),)
+
+    def raw_report():
+        return (OASISReport(xml_path, normalize=False),)
+
+    def normalized_report():
+        (report,) = raw_report()
+        report.normalize_report_dict()
+        return (report,)
+
+    return {
+        "xml_to_dict": (lambda: xml_to_dict(xml_path), None),
+        "normalize_report_dict": (lambda x: x.normalize_report_dict(), raw_report),
+        "to_dataframe": (lambda x: x.to_dataframe(), normalized_report),
+        "filter_report_dict": (
+            lambda x: x.filter_report_dict("RESOURCE_NAME", [node]),
+            parsed_report,
+        ),
+        "query": (
+            lambda x: x.query(RESOURCE_NAME=node).report_dataframe,
+            parsed_report,
+        ),
+        "to_xml": (lambda x: x.to_xml(), parsed_report),
+        "write_xml": (lambda x: x.write_xml(os.devnull), parsed_report),
+        "iterparse": (lambda: OASISReport(xml_path, parser="iterparse"), None),
+    }
+
+
+def fetch_report_stage(rows, directory, windows=FETCH_WINDOWS):
+    """
+    Returns the fetch_report stage for a report of rows rows split over
+    windows daily chunks. The chunks are synthetic zip files put in a
+    ChunkCache beforehand, so download, parse, trim, stitch and CSV output
+    are measured without going to the network.
+
+    :param rows: number of rows (int)
+    :param directory: working directory (string)
+    :param windows: number of daily chunks (int)
+    :return: (function, setup), see measure
+    """
+    cache = ChunkCache(os.path.join(directory, "cache"))
+    start = SYNTHETIC_START
+    end_limit = start + timedelta(days=windows)
+    for chunk_start, chunk_end in chunk_windows(start, end_limit, timedelta(days=1)):
+        url = create_oasis_url(
+            "PRC_LMP", chunk_start, chunk_end, BENCHMARK_QUERY_PARAMS
+        )
+        cache.put(
+            url,
+            synthetic_zip_bytes(
+                start=chunk_start, **synthetic_shape(max(1, rows // windows))
+            ),
+        )
+
+    def function():
+        return fetch_report(
+            "PRC_LMP",
+            start,
+            end_limit,
+            BENCHMARK_QUERY_PARAMS,
+            destination_directory=os.path.join(directory, "fetch_report"),
+            cache=cache,
+        )
+
+    return function, None
+
+
+def run_benchmarks(sizes=SIZES, stages=STAGES, directory=None, memory=True):
+    """
+    Benchmarks stages on synthetic reports of each size.
+
+    :param sizes: list of report sizes in rows
+    :param stages: list of stages, see STAGES
+    :param directory: working directory for synthetic reports, or None for
+        a temporary directory
+    :param memory: True to measure peak memory
+    :return: DataFrame of rows, stage, seconds and peak_mb
+    """
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(
+            "unknown stages {}, expected any of {}".format(unknown, STAGES)
+        )
+
+    with tempfile.TemporaryDirectory() as temp_directory:
+        directory = directory or temp_directory
+        os.makedirs(directory, exist_ok=True)
+
+        results = []
+        for rows in sizes:
+            xml_path = write_synthetic_xml(
+                os.path.join(directory, "synthetic_{}.xml".format(rows)),
+                **synthetic_shape(rows)
+            )
+            size_stages = report_stages(xml_path)
+            if "fetch_report" in stages:
+                size_stages["fetch_report"] = fetch_report_stage(
+                    rows, os.path.join(directory, "fetch_{}".format(rows))
+                )
+
+            for stage in stages:
+                seconds, peak = measure(*size_stages[stage], memory=memory)
+                results.append(
+                    {
+                        "rows": rows,
+                        "stage": stage,
+                        "seconds": seconds,
+                        "peak_mb": peak / 1024**2 if peak is not None else None,
+                    }
+                )
+
+    return pd.DataFrame(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=SIZES[:3], help="report sizes"
+    )
+    parser.add_argument(
+        "--stages", nargs="+", default=STAGES, choices=STAGES, help="stages to run"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip peak memory measurement"
+    )
+    parser.add_argument("--directory", help="keep synthetic reports here")
+    parser.add_argument("--output", help="also write results to this CSV file")
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(
+        arguments.rows,
+        arguments.stages,
+        arguments.directory,
+        memory=not arguments.no_memory,
+    )
+    print(results.to_string(index=False))
+    if arguments.output:
+        results.to_csv(arguments.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,40 @@
-import json
-import os
+"""
+Requests every sample endpoint of the catalog, either downloading the
+reports or validating the responses in memory, e.g.:
+
+    python -m pyoasis.bulk_query_oasis 2020-06-01 2020-06-02 --output results.jsonl
+"""
 
-from .utils import create_oasis_url, download_files, get_report_params
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import copy
+from datetime import datetime
+import json
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
 
+from .catalog import get_endpoint_catalog
+from .client import OASISClient
+from .utils import (
+    OASIS_BASE_URL,
+    PARALLEL_REQUEST_INTERVAL,
+    RequestThrottle,
+    create_oasis_url,
+    default_request_interval,
+    download_content,
+    download_files,
+    get_report_params,
+    inspect_zip_content,
+)
 
-# get location of oasis_endpoints.json file
-FILE_DIR = os.path.dirname(os.path.realpath(__file__))
-OASIS_ENDPOINTS_JSON = FILE_DIR + "/oasis_endpoints.json"
+# concurrent requests of a validation sweep
+VALIDATION_WORKERS = 4
 
 
-def generate_test_oasis_urls(start=None, end=None, report_name=None):
+def generate_test_oasis_urls(
+    start=None, end=None, report_name=None, base_url=OASIS_BASE_URL
+):
     """
     Generates a list of all OASIS endpoint urls scraped from API docs with
     custom start and end datetimes.
@@ -17,6 +42,7 @@ def generate_test_oasis_urls(start=None, end=None, report_name=None):
     :param start: start (datetime)
     :param end: end (datetime)
     :param report_name: filter sample endpoints by report_name
+    :param base_url: scheme and host of generated urls
     :return: list of urls
     """
     endpoint_urls = []
@@ -25,8 +51,7 @@ def generate_test_oasis_urls(start=None, end=None, report_name=None):
     if report_name:
         endpoints_dict = get_report_params(report_name)
     else:
-        with open(OASIS_ENDPOINTS_JSON) as f:
-            endpoints_dict = json.load(f)
+        endpoints_dict = copy.deepcopy(get_endpoint_catalog().endpoints_dict)
 
     for domain, path_dict in endpoints_dict.items():
         for path, report_dict in path_dict.items():
@@ -48,13 +73,21 @@ def generate_test_oasis_urls(start=None, end=None, report_name=None):
 
                     # generate url
                     endpoint_urls.append(
-                        create_oasis_url(report, start, end, query_params=param_dict)
+                        create_oasis_url(
+                            report,
+                            start,
+                            end,
+                            query_params=param_dict,
+                            base_url=base_url,
+                        )
                     )
 
     return endpoint_urls
 
 
-def download_all_oasis_reports(start, end, destination_directory, report_name=None):
+def download_all_oasis_reports(
+    start, end, destination_directory, report_name=None, client=None
+):
     """
     Downloads all OASIS reports from a certain time period. This is a heavy
     query on the OASIS API and should only be run seldomly for validation
@@ -70,18 +103,30 @@ def download_all_oasis_reports(start, end, destination_directory, report_name=No
     requests for the required reports. This way the user can eliminate
     unnecessary requests for the required data.
 
+    To only check that every endpoint answers, see validate_all_oasis_reports,
+    which sends requests in parallel and writes nothing to disk.
+
     :param start: start datetime
     :param end: end datetime
     :param destination_directory: location to store downloaded reports
     :param report_name: filter sample endpoints by report_name
     :param oasis_endpoints_json: JSON file containing all sample endpoints
+    :param client: pyoasis.client.OASISClient used for pooled connections
+        and retries
     """
-    oasis_urls = generate_test_oasis_urls(start, end, report_name)
+    oasis_urls = generate_test_oasis_urls(
+        start,
+        end,
+        report_name,
+        base_url=client.base_url if client else OASIS_BASE_URL,
+    )
 
     for url in oasis_urls:
         print("\n", url)
         try:
-            downloaded_files = download_files(url, destination_directory)
+            downloaded_files = download_files(
+                url, destination_directory, client=client
+            )
         except Exception:
             print("COULD NOT DOWNLOAD FILE: ", url)
             continue
@@ -89,3 +134,155 @@ def download_all_oasis_reports(start, end, destination_directory, report_name=No
         if any([x for x in downloaded_files if "INVALID_REQUEST.xml" in x]):
             print("INVALID URL: ", url)
             continue
+
+
+def validate_url(url, max_attempts=None, throttle=None, client=None):
+    """
+    Requests url and inspects the response in memory, see
+    inspect_zip_content.
+
+    :param url: (string)
+    :param max_attempts: maximum attempts, see download_content
+    :param throttle: RequestThrottle used to space out requests
+    :param client: pyoasis.client.OASISClient used to make the request
+    :return: dictionary of report_name, url, status, seconds, bytes,
+        members and error; status is "failed" if no zip file was received
+    """
+    query = parse_qs(urlsplit(url).query)
+    result = {
+        "report_name": (query.get("queryname") or query.get("groupid") or [None])[0],
+        "url": url,
+        "status": "failed",
+        "seconds": None,
+        "bytes": None,
+        "members": [],
+        "error": None,
+    }
+
+    started = time.perf_counter()
+    try:
+        content = download_content(url, max_attempts, throttle, client)
+        result["bytes"] = len(content)
+        result["status"], result["members"], result["error"] = inspect_zip_content(
+            content
+        )
+    except Exception as e:
+        result["error"] = "{}: {}".format(type(e).__name__, e)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+
+    return result
+
+
+def validate_all_oasis_reports(
+    start,
+    end,
+    report_name=None,
+    client=None,
+    max_workers=VALIDATION_WORKERS,
+    request_interval=None,
+    max_attempts=3,
+    output=None,
+):
+    """
+    Validates every sample endpoint from a certain time period with up to
+    max_workers requests in flight. Responses are inspected in memory
+    instead of being extracted to disk, see validate_url. Results are
+    yielded as soon as each request finishes, so slow endpoints do not hold
+    up the others, and are written as JSON lines to output if given.
+
+    :param start: start datetime
+    :param end: end datetime
+    :param report_name: filter sample endpoints by report_name
+    :param client: pyoasis.client.OASISClient used for pooled connections
+        and retries, defaults to one with max_workers connections
+    :param max_workers: number of concurrent requests (int)
+    :param request_interval: minimum seconds between the start of any two
+        requests (float). None to use the request_interval of client if it
+        sets one, otherwise PARALLEL_REQUEST_INTERVAL when max_workers > 1
+    :param max_attempts: maximum attempts per endpoint (int)
+    :param output: file-like object the results are written to as JSON
+        lines, e.g. sys.stdout
+    :return: generator of result dictionaries, see validate_url
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    own_client = client is None
+    client = client or OASISClient(pool_maxsize=max_workers)
+    if request_interval is None and client.request_interval is None:
+        request_interval = default_request_interval(request_interval, max_workers)
+    throttle = RequestThrottle(request_interval) if request_interval else None
+
+    urls = iter(
+        generate_test_oasis_urls(start, end, report_name, base_url=client.base_url)
+    )
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            while True:
+                for url in urls:
+                    pending.add(
+                        executor.submit(
+                            validate_url, url, max_attempts, throttle, client
+                        )
+                    )
+                    if len(pending) >= max_workers:
+                        break
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if output:
+                        output.write(json.dumps(result) + "\n")
+                        output.flush()
+                    yield result
+    finally:
+        if own_client:
+            client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("start", help="yyyy-mm-dd")
+    parser.add_argument("end", help="yyyy-mm-dd")
+    parser.add_argument("--report-name")
+    parser.add_argument("--base-url", default=OASIS_BASE_URL)
+    parser.add_argument("--max-workers", type=int, default=VALIDATION_WORKERS)
+    parser.add_argument(
+        "--request-interval",
+        type=float,
+        help="seconds between requests, default {} with several workers".format(
+            PARALLEL_REQUEST_INTERVAL
+        ),
+    )
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--output", help="JSON lines file, default stdout")
+    arguments = parser.parse_args()
+
+    output = open(arguments.output, "w") if arguments.output else sys.stdout
+    statuses = {}
+    with OASISClient(
+        base_url=arguments.base_url,
+        pool_maxsize=arguments.max_workers,
+        request_interval=arguments.request_interval,
+    ) as client:
+        for result in validate_all_oasis_reports(
+            datetime.strptime(arguments.start, "%Y-%m-%d"),
+            datetime.strptime(arguments.end, "%Y-%m-%d"),
+            report_name=arguments.report_name,
+            client=client,
+            max_workers=arguments.max_workers,
+            max_attempts=arguments.max_attempts,
+            output=output,
+        ):
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    if arguments.output:
+        output.close()
+
+    print(json.dumps(statuses), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
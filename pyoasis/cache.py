@@ -0,0 +1,257 @@
+from datetime import datetime, timedelta
+import hashlib
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+from zipfile import BadZipfile
+
+from .utils import inspect_zip_content
+
+# datetime format of startdatetime/enddatetime in OASIS querystrings
+QUERY_DATETIME_FORMAT = "%Y%m%dT%H:%M%z"
+
+
+def normalize_query(url):
+    """
+    Returns the querystring parameters of an OASIS url as a sorted list of
+    (key, value) tuples, so that urls that differ only in parameter order or
+    host map to the same cache entry.
+
+    :param url: (string)
+    :return: list of (string, string) tuples
+    """
+    return sorted(parse_qsl(urlsplit(url).query, keep_blank_values=True))
+
+
+class ChunkCache:
+    """
+    Persistent on-disk cache of raw OASIS zip responses keyed by report name,
+    normalized query params, chunk window and version (i.e. the normalized
+    querystring).
+
+    Entries are stored as directory/<report_name>/<key>.zip. The file mtime
+    records when an entry was downloaded and the atime when it was last used;
+    when max_bytes is exceeded the least recently used entries are evicted.
+
+    Data for intervals that ended less than `recent` before it was downloaded
+    may still be revised by CAISO, so such entries expire after `ttl`.
+    Entries for older intervals never expire.
+
+    INVALID_REQUEST.xml answers and ERROR responses other than "no data" are
+    never stored, so a failed window is requested again on the next run.
+    """
+
+    def __init__(self, directory, max_bytes=None, ttl=None, recent=timedelta(days=7)):
+        """
+        :param directory: cache directory (string)
+        :param max_bytes: size cap of the cache in bytes, None for no cap
+        :param ttl: lifetime of entries for recent intervals (timedelta), None
+            to keep them forever
+        :param recent: how close to its download time a chunk window must end
+            to count as recent (timedelta)
+        """
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.recent = recent
+
+        self._lock = threading.Lock()
+        self._size = None
+
+    def __repr__(self):
+        return "ChunkCache: " + self.directory
+
+    def path(self, url):
+        """
+        Returns the cache file location for url.
+
+        :param url: (string)
+        :return: absolute path (string)
+        """
+        params = normalize_query(url)
+        report_name = dict(params).get("queryname") or dict(params).get(
+            "groupid", "UNKNOWN"
+        )
+        key = hashlib.sha1(repr(params).encode()).hexdigest()
+
+        return os.path.join(self.directory, report_name, key + ".zip")
+
+    def is_expired(self, url, downloaded_at, now=None):
+        """
+        Returns True if an entry for url downloaded at downloaded_at (epoch
+        seconds) is past its ttl.
+        """
+        if self.ttl is None:
+            return False
+
+        now = now or time.time()
+        if now - downloaded_at <= self.ttl.total_seconds():
+            return False
+
+        # entries without a window end are always treated as recent
+        window_end = dict(normalize_query(url)).get("enddatetime")
+        if not window_end:
+            return True
+        try:
+            window_end = datetime.strptime(window_end, QUERY_DATETIME_FORMAT)
+        except ValueError:
+            return True
+
+        return window_end.timestamp() > downloaded_at - self.recent.total_seconds()
+
+    def get(self, url):
+        """
+        Returns the cached response content for url, or None on a miss.
+
+        :param url: (string)
+        :return: bytes or None
+        """
+        path = self.path(url)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        if self.is_expired(url, stat.st_mtime):
+            self._remove(path)
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            # mark as recently used, keeping the download time in mtime
+            os.utime(path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            return None
+
+        return content
+
+    def put(self, url, content):
+        """
+        Stores response content for url and evicts least recently used
+        entries if the cache grows past max_bytes. Content holding
+        INVALID_REQUEST.xml or an ERROR other than "no data" is not stored,
+        see is_cacheable.
+
+        :param url: (string)
+        :param content: zip file content (bytes)
+        :return: True if content was stored
+        """
+        if not self.is_cacheable(content):
+            return False
+
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # write to a temporary file first so readers never see partial entries
+        temp_path = "{}.{}.tmp".format(path, threading.get_ident())
+        with open(temp_path, "wb") as f:
+            f.write(content)
+
+        with self._lock:
+            size = self._current_size()
+            try:
+                size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(temp_path, path)
+            self._size = size + len(content)
+
+            if self.max_bytes is not None and self._size > self.max_bytes:
+                self._evict()
+
+        return True
+
+    @staticmethod
+    def is_cacheable(content):
+        """
+        Returns False for responses that must be requested again rather than
+        cached: INVALID_REQUEST.xml answers and ERROR responses other than
+        "no data" (see pyoasis.utils.inspect_zip_content).
+
+        :param content: zip file content (bytes)
+        :return: bool
+        """
+        try:
+            status, _, _ = inspect_zip_content(content)
+        except BadZipfile:
+            return False
+
+        return status in ("ok", "no_data")
+
+    def remove(self, url):
+        """
+        Removes the entry for url, if any.
+
+        :param url: (string)
+        """
+        self._remove(self.path(url))
+
+    def purge_errors(self):
+        """
+        Removes entries that are not cacheable, e.g. INVALID_REQUEST.xml
+        answers stored before they were rejected by put.
+
+        :return: number of entries removed (int)
+        """
+        removed = 0
+        for path, _, _ in self._entries():
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                continue
+            if not self.is_cacheable(content):
+                self._remove(path)
+                removed += 1
+
+        return removed
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            for path, _, _ in self._entries():
+                os.remove(path)
+            self._size = 0
+
+    def _entries(self):
+        """
+        Returns (path, size, last used) of all entries.
+        """
+        entries = []
+        for directory, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.endswith(".zip"):
+                    path = os.path.join(directory, filename)
+                    stat = os.stat(path)
+                    entries.append((path, stat.st_size, stat.st_atime))
+
+        return entries
+
+    def _current_size(self):
+        if self._size is None:
+            self._size = sum(x[1] for x in self._entries())
+
+        return self._size
+
+    def _remove(self, path):
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                return
+            if self._size is not None:
+                self._size -= size
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda x: x[2])
+        self._size = sum(x[1] for x in entries)
+        for path, size, _ in entries:
+            if self._size <= self.max_bytes:
+                break
+            os.remove(path)
+            self._size -= size
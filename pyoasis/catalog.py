@@ -0,0 +1,134 @@
+from collections import namedtuple
+import copy
+from functools import lru_cache
+import json
+import os
+
+# get location of oasis_endpoints.json file
+FILE_DIR = os.path.dirname(os.path.realpath(__file__))
+OASIS_ENDPOINTS_JSON = FILE_DIR + "/oasis_endpoints.json"
+
+# querystring parameters accepted by every report
+GENERIC_PARAMS = {"version", "resultformat", "startdatetime", "enddatetime"}
+
+Endpoint = namedtuple(
+    "Endpoint", ["domain", "path", "report_query", "param_sets", "param_names"]
+)
+Endpoint.__doc__ = """
+Endpoint of a single report: the domain and path it is queried at, the
+querystring key of the report name ("queryname" or "groupid"), the sample
+parameter sets from the API docs and the lowercased names of all parameters
+the report accepts.
+"""
+
+
+class EndpointCatalog:
+    """
+    Index of oasis_endpoints.json by report name. Use get_endpoint_catalog()
+    for the process-wide catalog, which is loaded once on first use.
+    """
+
+    def __init__(self, endpoints_dict):
+        """
+        :param endpoints_dict: dictionary of domain -> path -> report name ->
+            list of sample parameter sets, as in oasis_endpoints.json
+        """
+        self.endpoints_dict = endpoints_dict
+
+        self.endpoints = {}
+        for domain, path_dict in endpoints_dict.items():
+            for path, report_dict in path_dict.items():
+                report_query = "groupid" if path.endswith("GroupZip") else "queryname"
+                for report_name, param_sets in report_dict.items():
+                    param_names = set(GENERIC_PARAMS)
+                    for param_set in param_sets:
+                        param_names.update(x.lower() for x in param_set.keys())
+                    self.endpoints[report_name] = Endpoint(
+                        domain, path, report_query, param_sets, param_names
+                    )
+
+    def __repr__(self):
+        return "EndpointCatalog: {} reports".format(len(self.endpoints))
+
+    def __contains__(self, report_name):
+        return report_name in self.endpoints
+
+    @classmethod
+    def from_json(cls, json_path=OASIS_ENDPOINTS_JSON):
+        """
+        Loads a catalog from a JSON file in the format of oasis_endpoints.json.
+
+        :param json_path: (string)
+        :return: EndpointCatalog
+        """
+        with open(json_path) as f:
+            return cls(json.load(f))
+
+    def report_names(self):
+        """
+        Returns all report names.
+
+        :return: set of strings
+        """
+        return set(self.endpoints.keys())
+
+    def endpoint(self, report_name):
+        """
+        Returns the Endpoint of a report.
+
+        :param report_name: (string)
+        :return: Endpoint
+        """
+        try:
+            return self.endpoints[report_name]
+        except KeyError:
+            raise ValueError("unknown OASIS report: {}".format(report_name))
+
+    def report_params(self, report_name):
+        """
+        Returns a copy of the sample parameter sets of a report nested by
+        domain and path, as in oasis_endpoints.json.
+
+        :param report_name: (string)
+        :return: dictionary
+        """
+        endpoint = self.endpoint(report_name)
+
+        return {
+            endpoint.domain: {
+                endpoint.path: {report_name: copy.deepcopy(endpoint.param_sets)}
+            }
+        }
+
+    def validate(self, report_name, query_params):
+        """
+        Raises ValueError if report_name is unknown or query_params holds a
+        parameter the report does not accept, so that bad requests fail
+        before going to the network instead of returning INVALID_REQUEST.xml.
+        Parameter names are compared case-insensitively.
+
+        :param report_name: (string)
+        :param query_params: querystring parameters (dictionary)
+        """
+        endpoint = self.endpoint(report_name)
+
+        unknown = [
+            x for x in query_params if str(x).lower() not in endpoint.param_names
+        ]
+        if unknown:
+            raise ValueError(
+                "unknown parameters {} for OASIS report {}, expected any of {}".format(
+                    unknown, report_name, sorted(endpoint.param_names)
+                )
+            )
+
+
+@lru_cache(maxsize=None)
+def get_endpoint_catalog():
+    """
+    Returns the process-wide EndpointCatalog of oasis_endpoints.json, loaded
+    on first use.
+
+    :return: EndpointCatalog
+    """
+    return EndpointCatalog.from_json()
@@ -0,0 +1,193 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from io import BytesIO
+import random
+import requests
+from requests.adapters import HTTPAdapter
+import time
+from zipfile import BadZipfile, ZipFile
+
+from .metrics import emit
+from .utils import OASIS_BASE_URL, RequestThrottle
+
+# HTTP status codes OASIS uses to signal throttling or transient failures
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RetryableResponse(Exception):
+    """
+    Raised for responses that should be retried, e.g. 429 or 503.
+    """
+
+    def __init__(self, response):
+        super().__init__(
+            "{} {} for url: {}".format(
+                response.status_code, response.reason, response.url
+            )
+        )
+        self.response = response
+
+
+def parse_retry_after(value):
+    """
+    Converts a Retry-After header, given either in seconds or as an HTTP
+    date, to a number of seconds.
+
+    :param value: Retry-After header value (string)
+    :return: seconds (float) or None if value cannot be parsed
+    """
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if not retry_at.tzinfo:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+class OASISClient:
+    """
+    Reusable HTTP client for OASIS. Connections are kept alive and pooled
+    across requests, and failed requests are retried with exponential
+    backoff and full jitter. Network errors, including connections reset
+    while the body is read, throttling responses (see RETRY_STATUSES) and
+    bodies that are not zip files are all retried, and a Retry-After header
+    is honored when present.
+
+    A single client can be shared between threads, e.g. by fetch_report with
+    max_workers > 1.
+    """
+
+    def __init__(
+        self,
+        base_url=OASIS_BASE_URL,
+        timeout=(10, 300),
+        max_attempts=10,
+        backoff_factor=1,
+        max_backoff=300,
+        retry_statuses=RETRY_STATUSES,
+        pool_maxsize=4,
+        request_interval=None,
+    ):
+        """
+        :param base_url: scheme and host to send queries to
+        :param timeout: seconds to wait for the connection and for the
+            response, either a float or a (connect, read) tuple
+        :param max_attempts: default maximum attempts per request (int)
+        :param backoff_factor: base delay in seconds; attempt n waits up to
+            backoff_factor * 2 ** (n - 1) seconds
+        :param max_backoff: upper bound on a single backoff delay (seconds)
+        :param retry_statuses: HTTP status codes that are retried
+        :param pool_maxsize: number of connections kept alive (int)
+        :param request_interval: minimum seconds between the start of any two
+            requests made through the client (float). None to leave the
+            spacing to the caller, which knows how many requests run at once:
+            fetch_report and validate_all_oasis_reports then apply
+            PARALLEL_REQUEST_INTERVAL when they run several workers, and
+            other requests are not spaced out.
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+        self.request_interval = request_interval
+        self.throttle = RequestThrottle(request_interval or 0)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return "OASISClient: " + self.base_url
+
+    def close(self):
+        """
+        Closes all pooled connections.
+        """
+        self.session.close()
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """
+        Returns the number of seconds to wait before retrying.
+
+        :param attempt: number of the attempt that failed, starting at 1
+        :param retry_after: seconds requested by the server, if any
+        :return: seconds (float)
+        """
+        delay = random.uniform(
+            0, min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        )
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+
+        return delay
+
+    def get_content(self, url, max_attempts=None, throttle=None):
+        """
+        Requests url and returns the response content once it is a valid zip
+        file, retrying on network errors, throttling responses and non-zip
+        bodies.
+
+        :param url: (string)
+        :param max_attempts: maximum attempts, defaults to self.max_attempts
+        :param throttle: RequestThrottle to use instead of self.throttle
+        :return: bytes
+        """
+        max_attempts = max_attempts or self.max_attempts
+        throttle = throttle or self.throttle
+
+        attempt = 1
+        while True:
+            throttle.wait()
+            retry_after = None
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code in self.retry_statuses:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    raise RetryableResponse(response)
+                response.raise_for_status()
+                ZipFile(BytesIO(response.content))
+                return response.content
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.ContentDecodingError,
+                RetryableResponse,
+                BadZipfile,
+            ) as e:
+                if attempt >= max_attempts:
+                    raise
+                emit("retry", attempt=attempt, reason=type(e).__name__)
+                time.sleep(self.backoff_delay(attempt, retry_after))
+                attempt += 1
+
+    def get_zipfile(self, url, max_attempts=None, throttle=None):
+        """
+        Requests url and returns the response content as a ZipFile. See
+        get_content.
+
+        :param url: (string)
+        :param max_attempts: maximum attempts, defaults to self.max_attempts
+        :param throttle: RequestThrottle to use instead of self.throttle
+        :return: ZipFile
+        """
+        return ZipFile(BytesIO(self.get_content(url, max_attempts, throttle)))
@@ -0,0 +1,240 @@
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+Event = namedtuple("Event", ["name", "seconds", "fields"])
+Event.__doc__ = """
+Metrics event: the stage or event name, the seconds it took (None for
+untimed events such as retries) and a dictionary of fields, e.g. bytes,
+rows, report_name and window_start.
+"""
+
+# numeric event fields summed by PrometheusExporter
+COUNTED_FIELDS = ["bytes", "rows"]
+
+_observers = []
+_observers_lock = threading.Lock()
+_context = contextvars.ContextVar("pyoasis_metrics_context", default={})
+
+
+def add_observer(observer):
+    """
+    Registers observer to receive every metrics event of the process, e.g.
+    a LogExporter or PrometheusExporter.
+
+    :param observer: callable taking an Event
+    """
+    with _observers_lock:
+        _observers.append(observer)
+
+
+def remove_observer(observer):
+    """
+    Unregisters an observer added with add_observer.
+    """
+    with _observers_lock:
+        _observers.remove(observer)
+
+
+@contextmanager
+def observing(*observers):
+    """
+    Registers observers for the duration of a with block.
+    """
+    for observer in observers:
+        add_observer(observer)
+    try:
+        yield
+    finally:
+        for observer in observers:
+            remove_observer(observer)
+
+
+@contextmanager
+def context(**fields):
+    """
+    Adds fields to every event emitted by the current thread within a with
+    block, e.g. the report and window of a chunk.
+    """
+    token = _context.set(dict(_context.get(), **fields))
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def emit(name, seconds=None, **fields):
+    """
+    Sends an event to all observers. Does nothing without observers.
+
+    :param name: stage or event name (string)
+    :param seconds: duration of the stage, or None
+    :param fields: event fields
+    """
+    if not _observers:
+        return
+
+    event = Event(name, seconds, dict(_context.get(), **fields))
+    for observer in list(_observers):
+        observer(event)
+
+
+@contextmanager
+def stage(name, **fields):
+    """
+    Times a with block and emits it as an event. The block receives the
+    fields dictionary and can add to it, e.g. bytes or rows. A block that
+    raises is emitted with the exception name as error. Without observers,
+    nothing is timed.
+
+    :param name: stage name (string)
+    :param fields: event fields
+    """
+    if not _observers:
+        yield fields
+        return
+
+    start = time.perf_counter()
+    try:
+        yield fields
+    except Exception as e:
+        fields["error"] = type(e).__name__
+        raise
+    finally:
+        emit(name, time.perf_counter() - start, **fields)
+
+
+def peak_rss_bytes():
+    """
+    Returns the peak resident memory of the process so far, or None where
+    the resource module is not available.
+
+    :return: bytes (int)
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class LogExporter:
+    """
+    Observer logging each event as a single JSON line, for structured log
+    pipelines.
+    """
+
+    def __init__(self, logger=logging.getLogger("pyoasis.metrics"), level=logging.INFO):
+        """
+        :param logger: logging.Logger to log to
+        :param level: logging level of the events
+        """
+        self.logger = logger
+        self.level = level
+
+    def __repr__(self):
+        return "LogExporter: " + self.logger.name
+
+    def __call__(self, event):
+        record = {"event": event.name}
+        if event.seconds is not None:
+            record["seconds"] = round(event.seconds, 6)
+        record.update(event.fields)
+
+        self.logger.log(self.level, json.dumps(record, default=str))
+
+
+class PrometheusExporter:
+    """
+    Observer aggregating events into counters, rendered in the Prometheus
+    text exposition format, e.g. for the node_exporter textfile collector:
+
+        pyoasis_stage_seconds_total{stage="download"} 12.5
+        pyoasis_events_total{event="retry"} 3
+        pyoasis_bytes_total{stage="download"} 1048576
+        pyoasis_rows_total{stage="parse"} 190464
+        pyoasis_retries_total{reason="BadZipFile"} 3
+        pyoasis_peak_rss_bytes 524288000
+    """
+
+    def __init__(self, prefix="pyoasis"):
+        """
+        :param prefix: metric name prefix (string)
+        """
+        self.prefix = prefix
+        self.counters = defaultdict(float)
+        self.peak_rss_bytes = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "PrometheusExporter: " + self.prefix
+
+    def __call__(self, event):
+        with self._lock:
+            self.counters[("events_total", "event", event.name)] += 1
+            if event.seconds is not None:
+                self.counters[
+                    ("stage_seconds_total", "stage", event.name)
+                ] += event.seconds
+            for field in COUNTED_FIELDS:
+                if event.fields.get(field) is not None:
+                    self.counters[
+                        (field + "_total", "stage", event.name)
+                    ] += event.fields[field]
+            if event.name == "retry":
+                self.counters[
+                    ("retries_total", "reason", event.fields.get("reason", "unknown"))
+                ] += 1
+            if event.fields.get("peak_rss_bytes") is not None:
+                self.peak_rss_bytes = max(
+                    self.peak_rss_bytes or 0, event.fields["peak_rss_bytes"]
+                )
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+
+        :return: string
+        """
+        with self._lock:
+            counters = sorted(self.counters.items())
+            peak_rss_bytes = self.peak_rss_bytes
+
+        lines = []
+        metric = None
+        for (name, label, value), total in counters:
+            if name != metric:
+                metric = name
+                lines.append("# TYPE {}_{} counter".format(self.prefix, name))
+            lines.append(
+                '{}_{}{{{}="{}"}} {}'.format(self.prefix, name, label, value, total)
+            )
+        if peak_rss_bytes is not None:
+            lines.append("# TYPE {}_peak_rss_bytes gauge".format(self.prefix))
+            lines.append("{}_peak_rss_bytes {}".format(self.prefix, peak_rss_bytes))
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Writes render() to path atomically, so a collector never reads a
+        partial file.
+
+        :param path: (string)
+        """
+        with open(path + ".tmp", "w") as f:
+            f.write(self.render())
+        os.replace(path + ".tmp", path)
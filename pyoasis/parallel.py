@@ -0,0 +1,100 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+def pack_dataframe(report_dataframe):
+    """
+    Converts a DataFrame to a compact form for sending between processes.
+    Object (string) columns are factorized into an integer code buffer and
+    the array of distinct values, so repeated values such as RESOURCE_NAME
+    or timestamps are pickled once instead of once per row. Other columns
+    are already backed by NumPy buffers and are sent as they are.
+
+    :param report_dataframe: DataFrame
+    :return: (index, list of (column name, codes or None, values))
+    """
+    columns = []
+    for column, values in report_dataframe.items():
+        if values.dtype == object:
+            codes, uniques = pd.factorize(values, use_na_sentinel=False)
+            codes = codes.astype(np.min_scalar_type(len(uniques)))
+            columns.append((column, codes, np.asarray(uniques, dtype=object)))
+        else:
+            columns.append((column, None, values))
+
+    return report_dataframe.index, columns
+
+
+def unpack_dataframe(packed):
+    """
+    Rebuilds a DataFrame converted by pack_dataframe.
+
+    :param packed: output of pack_dataframe
+    :return: DataFrame
+    """
+    index, columns = packed
+
+    report_dataframe = pd.DataFrame(index=index)
+    for column, codes, values in columns:
+        if codes is not None:
+            values = values.take(codes)
+        report_dataframe[column] = values
+
+    return report_dataframe
+
+
+def parse_packed(parse, source):
+    """
+    Runs in a worker process: parses source and returns the packed
+    DataFrames.
+
+    :param parse: picklable function of source returning a list of
+        DataFrames
+    :param source: downloaded zip file content (bytes) or file paths
+    :return: list of packed DataFrames
+    """
+    return [pack_dataframe(x) for x in parse(source)]
+
+
+def parse_pipelined(chunks, parse, processes):
+    """
+    Parses downloaded chunks on a process pool while the next chunks are
+    still downloading. chunks yields (window, source, done) tuples, where
+    source is the downloaded zip file content or file paths, or already
+    parsed DataFrames when done is True (e.g. loaded from a checkpoint).
+    Up to processes chunks are parsed at once, and results are yielded in
+    the order of chunks.
+
+    :param chunks: iterable of (window, source, done)
+    :param parse: picklable function of source returning a list of
+        DataFrames, e.g. a functools.partial of a module-level function
+    :param processes: number of worker processes (int)
+    :return: generator of (window, list of DataFrames, done)
+    """
+    with ProcessPoolExecutor(processes) as executor:
+        pending = deque()
+        try:
+            for window, source, done in chunks:
+                if not done:
+                    source = executor.submit(parse_packed, parse, source)
+                pending.append((window, source, done))
+                if len(pending) > processes:
+                    yield _resolve_parsed(*pending.popleft())
+            while pending:
+                yield _resolve_parsed(*pending.popleft())
+        finally:
+            for _, source, done in pending:
+                if not done:
+                    source.cancel()
+
+
+def _resolve_parsed(window, source, done):
+    """
+    Waits for a chunk submitted by parse_pipelined.
+    """
+    if done:
+        return window, source, done
+
+    return window, [unpack_dataframe(x) for x in source.result()], done
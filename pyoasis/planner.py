@@ -0,0 +1,437 @@
+from collections import namedtuple
+from datetime import timedelta
+import json
+import math
+import os
+import threading
+
+from pyoasis.catalog import get_endpoint_catalog
+
+# bounds on the windows a ChunkPlanner will request
+MIN_CHUNK_SIZE = timedelta(hours=1)
+MAX_CHUNK_SIZE = timedelta(days=31)
+
+# nodes OASIS accepts in the comma-separated node parameter of one request
+MAX_NODES_PER_REQUEST = 10
+
+# approximate number of nodes a grp_type=ALL_APNODES request returns
+ALL_APNODES_COUNT = 3000
+
+# intervals per hour by market_run_id, and DATA_ITEMs per node of LMP reports
+INTERVALS_PER_HOUR = {"DAM": 1, "RUC": 1, "HASP": 4, "RTPD": 4, "RTM": 12}
+DATA_ITEMS_PER_NODE = 4
+
+# zipped size of a DATA row, and the cost of a request in bytes: OASIS
+# answers about one request every 5 seconds, at roughly 1 MB/s
+BYTES_PER_ROW = 32
+REQUEST_COST_BYTES = 5 * 1024**2
+
+# rows asked for in a single request, and the longest window of node and
+# ALL_APNODES requests
+MAX_REQUEST_ROWS = 500000
+MAX_NODE_WINDOW = timedelta(days=31)
+MAX_GROUP_WINDOW = timedelta(days=1)
+
+NodePlan = namedtuple(
+    "NodePlan",
+    ["strategy", "query_params", "filters", "chunk_size", "requests", "bytes"],
+)
+NodePlan.__doc__ = """
+Plan for fetching a report for a list of nodes: the strategy ("node",
+"node_batch" or "group"), the querystring parameters of each fetch_report
+call, the row filters applied locally, the window of each request, and the
+estimated number of requests and bytes downloaded.
+"""
+
+
+class ChunkPlanner:
+    """
+    Learns, per report and market_run_id, how large a query window OASIS
+    answers in full and how large its responses get, so that fetch_report
+    can cover a date range with as few requests as possible.
+
+    The window grows by growth_factor after each success and is halved after
+    a failure or a truncated response. The smallest failed window is
+    remembered, and growth then only probes halfway towards it until a
+    larger window succeeds. What was learned is stored as JSON at path,
+    so later runs start from it.
+    """
+
+    def __init__(
+        self,
+        path=None,
+        initial_chunk_size=timedelta(days=1),
+        min_chunk_size=MIN_CHUNK_SIZE,
+        max_chunk_size=MAX_CHUNK_SIZE,
+        growth_factor=2,
+        max_response_bytes=None,
+    ):
+        """
+        :param path: JSON file to load and store what was learned, or None
+            to only keep it in memory (string)
+        :param initial_chunk_size: window of reports without history
+            (timedelta)
+        :param min_chunk_size: smallest window; failures at this size are
+            raised (timedelta)
+        :param max_chunk_size: largest window (timedelta)
+        :param growth_factor: factor the window grows by after a success
+        :param max_response_bytes: cap on the expected size of a single
+            response, estimated from earlier responses, or None for no cap
+        """
+        self.path = os.path.abspath(os.path.expanduser(path)) if path else None
+        self.initial_chunk_size = initial_chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.growth_factor = growth_factor
+        self.max_response_bytes = max_response_bytes
+
+        self._lock = threading.Lock()
+
+        # key -> {"chunk_size", "max_success", "min_failure", "bytes_per_hour"}
+        self.plans = {}
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                self.plans = json.load(f)
+
+    def __repr__(self):
+        return "ChunkPlanner: " + str(self.path)
+
+    @staticmethod
+    def key(report_name, query_params):
+        """
+        Returns the key windows are learned under: the report name and its
+        market_run_id, if any.
+        """
+        return "{}/{}".format(report_name, query_params.get("market_run_id", ""))
+
+    def chunk_size(self, report_name, query_params):
+        """
+        Returns the window to request next.
+
+        :param report_name: (string)
+        :param query_params: querystring parameters (dictionary)
+        :return: timedelta
+        """
+        with self._lock:
+            plan = self.plans.get(self.key(report_name, query_params))
+
+        if not plan:
+            return self._clamp(self.initial_chunk_size.total_seconds())
+
+        return timedelta(seconds=plan["chunk_size"])
+
+    def record_success(self, report_name, query_params, window_size, response_bytes):
+        """
+        Records a window that was answered in full and grows the next one.
+
+        :param report_name: (string)
+        :param query_params: querystring parameters (dictionary)
+        :param window_size: length of the window (timedelta)
+        :param response_bytes: size of the response (int)
+        """
+        seconds = window_size.total_seconds()
+
+        with self._lock:
+            plan = self._plan(report_name, query_params)
+            plan["max_success"] = max(plan["max_success"] or 0, seconds)
+            if plan["min_failure"] and seconds >= plan["min_failure"]:
+                plan["min_failure"] = None
+
+            # running average of response size per hour of window
+            bytes_per_hour = response_bytes / max(seconds / 3600, 1)
+            if plan["bytes_per_hour"] is None:
+                plan["bytes_per_hour"] = bytes_per_hour
+            else:
+                plan["bytes_per_hour"] = (plan["bytes_per_hour"] + bytes_per_hour) / 2
+
+            next_seconds = max(plan["chunk_size"], seconds * self.growth_factor)
+            if plan["min_failure"]:
+                next_seconds = min(
+                    next_seconds, (plan["max_success"] + plan["min_failure"]) / 2
+                )
+            if self.max_response_bytes and plan["bytes_per_hour"]:
+                next_seconds = min(
+                    next_seconds,
+                    self.max_response_bytes / plan["bytes_per_hour"] * 3600,
+                )
+            plan["chunk_size"] = self._clamp(next_seconds).total_seconds()
+
+            self._save()
+
+    def record_failure(self, report_name, query_params, window_size, covered_size=None):
+        """
+        Records a window that failed or came back truncated. The next window
+        is the covered part of a truncated window, otherwise half the failed
+        window.
+
+        :param report_name: (string)
+        :param query_params: querystring parameters (dictionary)
+        :param window_size: length of the window (timedelta)
+        :param covered_size: length of the part of a truncated window that
+            was answered (timedelta)
+        """
+        seconds = window_size.total_seconds()
+        if covered_size:
+            next_seconds = covered_size.total_seconds()
+        else:
+            next_seconds = seconds / 2
+
+        with self._lock:
+            plan = self._plan(report_name, query_params)
+            plan["min_failure"] = min(plan["min_failure"] or seconds, seconds)
+            plan["chunk_size"] = self._clamp(
+                min(plan["chunk_size"], next_seconds)
+            ).total_seconds()
+
+            self._save()
+
+    def can_split(self, window_size):
+        """
+        Returns True if window_size can be halved without going below
+        min_chunk_size.
+        """
+        return window_size >= 2 * self.min_chunk_size
+
+    def split(self, chunk_start, chunk_end):
+        """
+        Returns the two halves of a window, split on a whole multiple of
+        min_chunk_size.
+
+        :param chunk_start: datetime
+        :param chunk_end: datetime
+        :return: two (datetime, datetime) tuples
+        """
+        middle = chunk_start + self._clamp(
+            (chunk_end - chunk_start).total_seconds() / 2
+        )
+
+        return (chunk_start, middle), (middle, chunk_end)
+
+    def _plan(self, report_name, query_params):
+        key = self.key(report_name, query_params)
+        if key not in self.plans:
+            self.plans[key] = {
+                "chunk_size": self._clamp(
+                    self.initial_chunk_size.total_seconds()
+                ).total_seconds(),
+                "max_success": None,
+                "min_failure": None,
+                "bytes_per_hour": None,
+            }
+
+        return self.plans[key]
+
+    def _clamp(self, seconds):
+        """
+        Rounds seconds down to whole multiples of min_chunk_size within the
+        planner's bounds.
+        """
+        step = self.min_chunk_size.total_seconds()
+        seconds = max(step, min(seconds, self.max_chunk_size.total_seconds()))
+
+        return timedelta(seconds=seconds // step * step)
+
+    def _save(self):
+        if not self.path:
+            return
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.plans, f, indent=2, sort_keys=True)
+        os.replace(self.path + ".tmp", self.path)
+
+
+class NodePlanner:
+    """
+    Chooses how to fetch a report for a list of nodes. Reports accepting a
+    node parameter (see oasis_endpoints.json) can be requested one node at a
+    time ("node") or for up to max_nodes_per_request comma-separated nodes
+    ("node_batch"); reports accepting grp_type=ALL_APNODES can be requested
+    for every node at once and filtered locally ("group").
+
+    Each strategy is costed as the bytes it downloads plus request_cost_bytes
+    per request, and the cheapest is chosen: a few nodes over a long range
+    favor node requests, many nodes over a short range favor ALL_APNODES.
+    """
+
+    def __init__(
+        self,
+        catalog=None,
+        max_nodes_per_request=MAX_NODES_PER_REQUEST,
+        all_apnodes_count=ALL_APNODES_COUNT,
+        bytes_per_row=BYTES_PER_ROW,
+        request_cost_bytes=REQUEST_COST_BYTES,
+        max_request_rows=MAX_REQUEST_ROWS,
+        max_node_window=MAX_NODE_WINDOW,
+        max_group_window=MAX_GROUP_WINDOW,
+        node_column="RESOURCE_NAME",
+    ):
+        """
+        :param catalog: pyoasis.catalog.EndpointCatalog, defaults to the
+            catalog of oasis_endpoints.json
+        :param max_nodes_per_request: nodes per "node_batch" request (int)
+        :param all_apnodes_count: nodes returned by an ALL_APNODES request
+        :param bytes_per_row: estimated zipped size of a DATA row
+        :param request_cost_bytes: cost of a single request in bytes
+        :param max_request_rows: rows asked for in a single request, which
+            bounds the window of each request
+        :param max_node_window: longest window of node requests (timedelta)
+        :param max_group_window: longest window of ALL_APNODES requests
+            (timedelta)
+        :param node_column: column of node names filtered on locally
+        """
+        self.catalog = catalog or get_endpoint_catalog()
+        self.max_nodes_per_request = max_nodes_per_request
+        self.all_apnodes_count = all_apnodes_count
+        self.bytes_per_row = bytes_per_row
+        self.request_cost_bytes = request_cost_bytes
+        self.max_request_rows = max_request_rows
+        self.max_node_window = max_node_window
+        self.max_group_window = max_group_window
+        self.node_column = node_column
+
+    def __repr__(self):
+        return "NodePlanner: {} nodes per request".format(self.max_nodes_per_request)
+
+    def strategies(self, report_name):
+        """
+        Returns the strategies a report supports.
+
+        :param report_name: (string)
+        :return: list of strings
+        """
+        endpoint = self.catalog.endpoint(report_name)
+
+        strategies = []
+        if "node" in endpoint.param_names:
+            strategies += ["node", "node_batch"]
+        if any(
+            str(y).upper() == "ALL_APNODES"
+            for x in endpoint.param_sets
+            for z, y in x.items()
+            if z.lower() == "grp_type"
+        ):
+            strategies.append("group")
+
+        return strategies
+
+    @staticmethod
+    def rows_per_node_hour(query_params):
+        """
+        Returns the estimated DATA rows per node and hour of a query.
+        """
+        market_run_id = str(query_params.get("market_run_id", "")).upper()
+
+        return INTERVALS_PER_HOUR.get(market_run_id, 1) * DATA_ITEMS_PER_NODE
+
+    def cost(self, plan):
+        """
+        Returns the cost of a plan in bytes.
+        """
+        return plan.bytes + plan.requests * self.request_cost_bytes
+
+    def candidates(self, report_name, nodes, start, end, query_params):
+        """
+        Returns a plan for each strategy the report supports, cheapest first.
+
+        :param report_name: (string)
+        :param nodes: node names (list of strings)
+        :param start: datetime
+        :param end: datetime
+        :param query_params: querystring parameters without node or grp_type
+        :return: list of NodePlan
+        """
+        nodes = list(dict.fromkeys(nodes))
+        if not nodes:
+            raise ValueError("nodes must not be empty")
+
+        # node and grp_type are chosen by the plan
+        query_params = {
+            x: y
+            for x, y in query_params.items()
+            if x.lower() not in ("node", "grp_type")
+        }
+        hours = max(math.ceil((end - start).total_seconds() / 3600), 1)
+        rows_per_node_hour = self.rows_per_node_hour(query_params)
+
+        plans = []
+        for strategy in self.strategies(report_name):
+            if strategy == "group":
+                node_batches = [None]
+                request_nodes = max(self.all_apnodes_count, len(nodes))
+                fetched_nodes = request_nodes
+                max_window = self.max_group_window
+            else:
+                batch_size = 1 if strategy == "node" else self.max_nodes_per_request
+                if strategy == "node_batch" and (batch_size < 2 or len(nodes) < 2):
+                    continue
+                node_batches = [
+                    nodes[x : x + batch_size] for x in range(0, len(nodes), batch_size)
+                ]
+                request_nodes = len(node_batches[0])
+                fetched_nodes = len(nodes)
+                max_window = self.max_node_window
+
+            chunk_size, windows = self._chunk_size(
+                hours,
+                min(
+                    self.max_request_rows / (request_nodes * rows_per_node_hour),
+                    max_window.total_seconds() / 3600,
+                ),
+            )
+            fetched_hours = windows * chunk_size.total_seconds() / 3600
+
+            plans.append(
+                NodePlan(
+                    strategy=strategy,
+                    query_params=[
+                        (
+                            dict(query_params, grp_type="ALL_APNODES")
+                            if x is None
+                            else dict(query_params, node=",".join(x))
+                        )
+                        for x in node_batches
+                    ],
+                    filters=(
+                        {self.node_column: set(nodes)} if strategy == "group" else {}
+                    ),
+                    chunk_size=chunk_size,
+                    requests=len(node_batches) * windows,
+                    bytes=int(
+                        fetched_nodes
+                        * fetched_hours
+                        * rows_per_node_hour
+                        * self.bytes_per_row
+                    ),
+                )
+            )
+
+        return sorted(plans, key=lambda x: (self.cost(x), x.requests))
+
+    def plan(self, report_name, nodes, start, end, query_params):
+        """
+        Returns the cheapest plan, see candidates.
+
+        :return: NodePlan
+        """
+        plans = self.candidates(report_name, nodes, start, end, query_params)
+        if not plans:
+            raise ValueError(
+                "OASIS report {} accepts neither node nor grp_type=ALL_APNODES".format(
+                    report_name
+                )
+            )
+
+        return plans[0]
+
+    @staticmethod
+    def _chunk_size(hours, max_hours):
+        """
+        Returns the window splitting hours into the fewest windows of at most
+        max_hours, in whole hours, and the number of windows. fetch_report
+        requests whole windows, so an even split fetches the least beyond
+        the end.
+        """
+        windows = math.ceil(hours / max(1, max_hours // 1))
+
+        return timedelta(hours=math.ceil(hours / windows)), windows
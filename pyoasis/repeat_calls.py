@@ -1,10 +1,47 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import partial
+import hashlib
+from io import BytesIO
+import json
 import os
 import pandas as pd
 from pytz import timezone
+import re
+import requests
+import shutil
+import threading
+from zipfile import BadZipfile, ZipFile
 
-from pyoasis.utils import create_oasis_url, download_files
+from pyoasis.client import RetryableResponse
+from pyoasis.metrics import context, emit, peak_rss_bytes, stage
+from pyoasis.parallel import parse_pipelined
+from pyoasis.planner import NodePlanner
+from pyoasis.utils import (
+    OASIS_BASE_URL,
+    compile_filters,
+    create_oasis_url,
+    default_request_interval,
+    download_content,
+    download_files,
+    open_zip_members,
+    RequestThrottle,
+)
 from pyoasis.report import OASISReport
+from pyoasis.sinks import MemorySink
+
+# upper bound on concurrent OASIS requests from a single fetch_report call
+MAX_WORKERS = 4
+
+# OASIS ERR_CODE of responses without data, which is not a failure
+NO_DATA_ERROR_CODE = "1000"
+
+
+class OASISError(Exception):
+    """
+    Raised for OASIS responses holding an ERROR other than no data.
+    """
 
 
 def repeat_download():
@@ -44,12 +81,15 @@ def repeat_download():
             query_params=query_params,
         )
         location = download_files(url, "downloads")
-        oasis_report = OASISReport(location[0])
+        # only NP15 rows are read from the file
+        oasis_report = OASISReport(
+            location[0],
+            parser="iterparse",
+            filters={"RESOURCE_NAME": re.compile("NP15")},
+        )
         os.remove(location[0])
 
-        df = oasis_report.report_dataframe
-
-        df_filtered = df[df["RESOURCE_NAME"].str.contains("NP15")]
+        df_filtered = oasis_report.report_dataframe
 
         df_filtered.to_csv(
             "downloads/CSVs/"
@@ -78,6 +118,654 @@ def repeat_download():
                 end_temp = min(start + timedelta(days=day_delta), end)
 
 
+def chunk_windows(start, end_limit, chunk_size):
+    """
+    Yields consecutive (chunk_start, chunk_end) windows of chunk_size
+    covering start through end_limit.
+
+    :param start: datetime
+    :param end_limit: datetime
+    :param chunk_size: length of each window (timedelta)
+    :return: generator of (datetime, datetime) tuples
+    """
+    chunk_start = start
+    chunk_end = chunk_start + chunk_size
+    while chunk_end < end_limit + chunk_size:
+        yield chunk_start, chunk_end
+        chunk_start = chunk_end
+        chunk_end = chunk_end + chunk_size
+
+
+def imap_ordered(function, iterable, max_workers=1):
+    """
+    Like map, but runs up to max_workers calls at once on a thread pool.
+    Results are yielded in the order of iterable, and no more than
+    max_workers results are computed ahead of the consumer. Pending calls are
+    cancelled if the consumer stops early or a call raises.
+
+    :param function: callable taking one item of iterable
+    :param iterable: iterable of items
+    :param max_workers: number of threads (int)
+    :return: generator of results
+    """
+    if max_workers == 1:
+        yield from map(function, iterable)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        try:
+            for item in iterable:
+                pending.append(executor.submit(function, item))
+                if len(pending) >= max_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def trim_report_dataframe(
+    report_dataframe,
+    start,
+    end_limit,
+    start_column="INTERVAL_START_GMT",
+    end_column="INTERVAL_END_GMT",
+):
+    """
+    Parses the timestamp columns of report_dataframe and keeps only rows
+    between start and end_limit.
+
+    :param report_dataframe: DataFrame
+    :param start: timezone-aware datetime
+    :param end_limit: timezone-aware datetime
+    :param start_column: column name of start timestamps
+    :param end_column: column name of end timestamps
+    :return: DataFrame
+    """
+    report_dataframe[start_column] = pd.to_datetime(report_dataframe[start_column])
+    report_dataframe[end_column] = pd.to_datetime(report_dataframe[end_column])
+
+    return report_dataframe[
+        (report_dataframe[start_column] >= start)
+        & (report_dataframe[end_column] <= end_limit)
+    ]
+
+
+def with_required_columns(columns, required):
+    """
+    Returns a column projection extended with the required columns.
+
+    :param columns: list of DATA columns to keep, or None for all
+    :param required: list of columns that must be kept
+    :return: list of columns, or None for all
+    """
+    if columns is None:
+        return None
+
+    return list(columns) + [x for x in required if x not in columns]
+
+
+def download_chunk(
+    report_name,
+    chunk_start,
+    chunk_end,
+    query_params,
+    max_attempts=10,
+    destination_directory="caiso_downloads",
+    keep_temp_files=False,
+    throttle=None,
+    client=None,
+    cache=None,
+    refresh=False,
+):
+    """
+    Downloads a single report window from OASIS without parsing it.
+
+    :param report_name: see pyoasis.utils.get_report_names()
+    :param chunk_start: datetime
+    :param chunk_end: datetime
+    :param query_params: see pyoasis.utils.get_report_params()
+    :param max_attempts: number of back-off attempts (int)
+    :param destination_directory: directory to store temporary files
+    :param keep_temp_files: True to extract the CAISO files to
+        destination_directory, otherwise the zip file is kept in memory
+    :param throttle: RequestThrottle shared between concurrent downloads
+    :param client: pyoasis.client.OASISClient used to make the request
+    :param cache: pyoasis.cache.ChunkCache checked before going to the network
+    :param refresh: True to download the window even when cached, replacing
+        the cached entry
+    :return: zip file content (bytes), or file paths (list of strings) when
+        keep_temp_files
+    """
+    url = create_oasis_url(
+        report_name=report_name,
+        start=chunk_start,
+        end=chunk_end,
+        query_params=query_params,
+        base_url=client.base_url if client else OASIS_BASE_URL,
+    )
+    if keep_temp_files:
+        return download_files(
+            url=url,
+            destination_directory=destination_directory,
+            max_attempts=max_attempts,
+            throttle=throttle,
+            client=client,
+            cache=cache,
+            refresh=refresh,
+        )
+
+    return download_content(
+        url=url,
+        max_attempts=max_attempts,
+        throttle=throttle,
+        client=client,
+        cache=cache,
+        refresh=refresh,
+    )
+
+
+def parse_chunk(source, parser="xmltodict", typed=False, filters=None, columns=None):
+    """
+    Parses a report window downloaded by download_chunk.
+
+    :param source: zip file content (bytes) or file paths (list of strings)
+    :param parser: OASISReport parser ("xmltodict" or "iterparse")
+    :param typed: True to parse columns to the report's typed schema
+    :param filters: row filters applied while parsing, see OASISReport
+    :param columns: list of DATA columns to keep, or None for all
+    :return: list of DataFrames, one per report file in the response
+    :raises OASISError: for a report holding an ERROR other than no data,
+        e.g. INVALID_REQUEST.xml
+    """
+    with stage("parse", parser=parser) as fields:
+        oasis_reports = parse_chunk_reports(source, parser, typed, filters, columns)
+        check_chunk_errors(oasis_reports)
+        report_dataframes = chunk_dataframes(oasis_reports)
+        fields["rows"] = sum(len(x) for x in report_dataframes)
+
+    return report_dataframes
+
+
+def check_chunk_errors(oasis_reports):
+    """
+    Raises OASISError for the first report holding an ERROR other than no
+    data, e.g. INVALID_REQUEST.xml, so that a window OASIS refused is never
+    mistaken for a window without data.
+
+    :param oasis_reports: list of OASISReport
+    """
+    for oasis_report in oasis_reports:
+        if oasis_report.error and oasis_report.error[0] != NO_DATA_ERROR_CODE:
+            raise OASISError(oasis_report.error)
+
+
+def chunk_dataframes(oasis_reports):
+    """
+    Returns the DataFrames of the reports that hold rows. Reports with an
+    ERROR or whose rows were all removed by filters are left out, since they
+    have no columns to trim or sort on.
+
+    :param oasis_reports: list of OASISReport
+    :return: list of DataFrames
+    """
+    return [
+        x.report_dataframe
+        for x in oasis_reports
+        if hasattr(x, "report_dataframe") and not x.report_dataframe.empty
+    ]
+
+
+def parse_chunk_reports(
+    source, parser="xmltodict", typed=False, filters=None, columns=None
+):
+    """
+    Parses a report window downloaded by download_chunk into OASISReports,
+    including reports holding an ERROR. See parse_chunk.
+
+    :return: list of OASISReport
+    """
+    if isinstance(source, bytes):
+        source = open_zip_members(ZipFile(BytesIO(source)))
+
+    return [
+        OASISReport(x, parser=parser, typed=typed, filters=filters, columns=columns)
+        for x in source
+    ]
+
+
+def fetch_chunk(
+    report_name,
+    chunk_start,
+    chunk_end,
+    query_params,
+    max_attempts=10,
+    destination_directory="caiso_downloads",
+    keep_temp_files=False,
+    parser="xmltodict",
+    typed=False,
+    filters=None,
+    columns=None,
+    throttle=None,
+    client=None,
+    cache=None,
+    refresh=False,
+):
+    """
+    Downloads and parses a single report window from OASIS.
+
+    :param report_name: see pyoasis.utils.get_report_names()
+    :param chunk_start: datetime
+    :param chunk_end: datetime
+    :param query_params: see pyoasis.utils.get_report_params()
+    :param max_attempts: number of back-off attempts (int)
+    :param destination_directory: directory to store temporary files
+    :param keep_temp_files: True to keep intermediary CAISO files, otherwise
+        the downloaded zip files are parsed in memory without touching disk
+    :param parser: OASISReport parser ("xmltodict" or "iterparse")
+    :param typed: True to parse columns to the report's typed schema
+    :param filters: row filters applied while parsing, see OASISReport
+    :param columns: list of DATA columns to keep, or None for all
+    :param throttle: RequestThrottle shared between concurrent downloads
+    :param client: pyoasis.client.OASISClient used to make the request
+    :param cache: pyoasis.cache.ChunkCache checked before going to the network
+    :param refresh: True to download the window even when cached, replacing
+        the cached entry
+    :return: list of DataFrames, one per report file in the response
+    """
+    source = download_chunk(
+        report_name=report_name,
+        chunk_start=chunk_start,
+        chunk_end=chunk_end,
+        query_params=query_params,
+        max_attempts=max_attempts,
+        destination_directory=destination_directory,
+        keep_temp_files=keep_temp_files,
+        throttle=throttle,
+        client=client,
+        cache=cache,
+        refresh=refresh,
+    )
+
+    return parse_chunk(source, parser, typed, filters, columns)
+
+
+def planned_windows(start, end_limit, next_chunk_size):
+    """
+    Yields consecutive (chunk_start, chunk_end) windows covering start
+    through end_limit, asking next_chunk_size for the length of each window
+    as it is needed.
+
+    :param start: datetime
+    :param end_limit: datetime
+    :param next_chunk_size: function returning a timedelta
+    :return: generator of (datetime, datetime) tuples
+    """
+    chunk_start = start
+    while chunk_start < end_limit:
+        chunk_end = min(chunk_start + next_chunk_size(), end_limit)
+        yield chunk_start, chunk_end
+        chunk_start = chunk_end
+
+
+def fetch_planned_chunk(
+    planner,
+    report_name,
+    chunk_start,
+    chunk_end,
+    query_params,
+    start_column="INTERVAL_START_GMT",
+    end_column="INTERVAL_END_GMT",
+    parser="xmltodict",
+    typed=False,
+    filters=None,
+    columns=None,
+    **download_arguments
+):
+    """
+    Downloads and parses a single report window like fetch_chunk, and
+    records the outcome in a pyoasis.planner.ChunkPlanner. Windows that fail
+    (download errors or an OASIS ERROR other than no data) are split in half
+    and each half is fetched. Windows whose data ends before chunk_end are
+    treated as truncated and completed by fetching the rest of the window.
+
+    Truncation is only inferred from where the data ends, so a window whose
+    data really does end early, e.g. intervals not yet published or a node
+    retired mid-window, is a false positive: the rest of the window is
+    requested again (answered with no data) and the planner shrinks its next
+    window for the report.
+
+    :param planner: pyoasis.planner.ChunkPlanner
+    :param report_name: see pyoasis.utils.get_report_names()
+    :param chunk_start: datetime
+    :param chunk_end: datetime
+    :param query_params: see pyoasis.utils.get_report_params()
+    :param start_column: column name of start timestamps
+    :param end_column: column name of end timestamps
+    :param parser: OASISReport parser ("xmltodict" or "iterparse")
+    :param typed: True to parse columns to the report's typed schema
+    :param filters: row filters applied while parsing, see OASISReport
+    :param columns: list of DATA columns to keep, or None for all
+    :param download_arguments: keyword arguments of download_chunk
+    :return: list of DataFrames
+    """
+    window_size = chunk_end - chunk_start
+    arguments = dict(
+        planner=planner,
+        report_name=report_name,
+        query_params=query_params,
+        start_column=start_column,
+        end_column=end_column,
+        parser=parser,
+        typed=typed,
+        filters=filters,
+        columns=columns,
+        **download_arguments
+    )
+
+    try:
+        source = download_chunk(
+            report_name=report_name,
+            chunk_start=chunk_start,
+            chunk_end=chunk_end,
+            query_params=query_params,
+            **download_arguments
+        )
+        oasis_reports = parse_chunk_reports(source, parser, typed, filters, columns)
+        check_chunk_errors(oasis_reports)
+    except (requests.RequestException, RetryableResponse, BadZipfile, OASISError):
+        if not planner.can_split(window_size):
+            raise
+        planner.record_failure(report_name, query_params, window_size)
+        report_dataframes = []
+        for window in planner.split(chunk_start, chunk_end):
+            report_dataframes += fetch_planned_chunk(
+                chunk_start=window[0], chunk_end=window[1], **arguments
+            )
+        return report_dataframes
+
+    report_dataframes = chunk_dataframes(oasis_reports)
+
+    # data ending before chunk_end was truncated, fetch the rest
+    if report_dataframes and all(end_column in x for x in report_dataframes):
+        covered_end = max(
+            pd.to_datetime(x[end_column], utc=True).max() for x in report_dataframes
+        )
+        if chunk_start < covered_end < chunk_end:
+            planner.record_failure(
+                report_name, query_params, window_size, covered_end - chunk_start
+            )
+            return report_dataframes + fetch_planned_chunk(
+                chunk_start=covered_end.to_pydatetime().astimezone(chunk_start.tzinfo),
+                chunk_end=chunk_end,
+                **arguments
+            )
+
+    if isinstance(source, bytes):
+        response_bytes = len(source)
+    else:
+        response_bytes = sum(os.path.getsize(x) for x in source)
+    planner.record_success(report_name, query_params, window_size, response_bytes)
+
+    return report_dataframes
+
+
+class ChunkCheckpoint:
+    """
+    Checkpoint of a fetch_report run. A manifest of finished chunk windows is
+    appended to as chunks complete and each window's parsed DataFrames are
+    pickled alongside it, so a restarted run only fetches missing windows.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: checkpoint directory, created if missing (string)
+        """
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, "manifest.jsonl")
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+        # window key -> chunk file of completed windows
+        self.completed = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # partially written last line of an interrupted run
+                        continue
+                    if entry["file"] is None or os.path.exists(
+                        os.path.join(directory, entry["file"])
+                    ):
+                        self.completed[entry["window"]] = entry["file"]
+
+    def __repr__(self):
+        return "ChunkCheckpoint: " + self.directory
+
+    def __contains__(self, window):
+        return self.window_key(window) in self.completed
+
+    @classmethod
+    def for_run(cls, destination_directory, **run_arguments):
+        """
+        Returns the checkpoint of a run identified by its arguments, so that a
+        restart with the same arguments finds the same checkpoint.
+
+        :param destination_directory: directory holding checkpoints
+        :param run_arguments: arguments identifying the run
+        :return: ChunkCheckpoint
+        """
+        if run_arguments.get("filters"):
+            run_arguments = dict(
+                run_arguments, filters=cls.filters_key(run_arguments["filters"])
+            )
+        run_id = hashlib.sha1(
+            json.dumps(run_arguments, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+        return cls(
+            os.path.join(
+                os.path.abspath(destination_directory),
+                ".checkpoint_{}_{}".format(run_arguments.get("report_name"), run_id),
+            )
+        )
+
+    @staticmethod
+    def filters_key(filters):
+        """
+        Returns row filters in a form that is the same in every run, for
+        identifying a run. Functions have no such form, since their str
+        holds a memory address, so they cannot identify a run.
+
+        :param filters: dictionary of column name to filter, see
+            pyoasis.utils.compile_filters
+        :return: dictionary of column name to JSON-serializable value
+        """
+        key = {}
+        for column, filter_ in filters.items():
+            if isinstance(filter_, re.Pattern):
+                key[column] = {"pattern": filter_.pattern, "flags": filter_.flags}
+            elif callable(filter_):
+                raise ValueError(
+                    "resume cannot be combined with a function filter on {}; "
+                    "use a value, a collection of values or a regular "
+                    "expression".format(column)
+                )
+            elif isinstance(filter_, str) or not hasattr(filter_, "__iter__"):
+                key[column] = filter_
+            else:
+                key[column] = sorted(str(x) for x in filter_)
+
+        return key
+
+    @staticmethod
+    def window_key(window):
+        """
+        Returns the manifest key of a (chunk_start, chunk_end) window.
+        """
+        return "{}_{}".format(window[0].isoformat(), window[1].isoformat())
+
+    def save(self, window, report_dataframes=None):
+        """
+        Stores the parsed output of a window and records it in the manifest.
+
+        :param window: (chunk_start, chunk_end)
+        :param report_dataframes: list of DataFrames, or None to only mark
+            the window as completed, e.g. when its output was already
+            written to a sink
+        """
+        key = self.window_key(window)
+        filename = None
+        if report_dataframes is not None:
+            filename = hashlib.sha1(key.encode()).hexdigest() + ".pkl"
+            path = os.path.join(self.directory, filename)
+            pd.to_pickle(report_dataframes, path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+        with self._lock:
+            with open(self.manifest_path, "a") as f:
+                f.write(json.dumps({"window": key, "file": filename}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.completed[key] = filename
+
+    def load(self, window):
+        """
+        Returns the stored output of a completed window.
+
+        :param window: (chunk_start, chunk_end)
+        :return: list of DataFrames, empty if no output was stored
+        """
+        filename = self.completed[self.window_key(window)]
+        if filename is None:
+            return []
+
+        return pd.read_pickle(os.path.join(self.directory, filename))
+
+    def remove(self):
+        """
+        Deletes the checkpoint once the run has finished.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def observe_chunk(fetch_window, report_name, window, count_rows=True):
+    """
+    Calls fetch_window(window) and emits it as a "chunk" metrics event with
+    its rows and the peak memory of the process. All events of the window,
+    e.g. downloads and retries, are tagged with report_name and the window
+    start.
+
+    :param fetch_window: function of window returning (window, chunk,
+        checkpointed)
+    :param report_name: see pyoasis.utils.get_report_names()
+    :param window: (datetime, datetime)
+    :param count_rows: False when the chunk is not parsed yet
+    :return: result of fetch_window
+    """
+    with context(report_name=report_name, window_start=window[0].isoformat()):
+        with stage("chunk") as fields:
+            window, chunk, checkpointed = fetch_window(window)
+            if count_rows:
+                fields["rows"] = sum(len(x) for x in chunk)
+            fields["checkpointed"] = checkpointed
+            fields["peak_rss_bytes"] = peak_rss_bytes()
+
+    return window, chunk, checkpointed
+
+
+def stitch_report_dataframes(
+    report_dataframes,
+    start,
+    end_limit,
+    start_column="INTERVAL_START_GMT",
+    end_column="INTERVAL_END_GMT",
+    sort_by=["DATA_ITEM", "INTERVAL_START_GMT"],
+):
+    """
+    Concatenates chunk DataFrames into a single report trimmed to start and
+    end_limit.
+
+    :param report_dataframes: iterable of DataFrames in time order
+    :param start: timezone-aware datetime
+    :param end_limit: timezone-aware datetime
+    :param start_column: column name of start timestamps
+    :param end_column: column name of end timestamps
+    :param sort_by: sort order of resultant dataframe
+    :return: DataFrame, empty when there are no chunk DataFrames
+    """
+    with stage("stitch") as fields:
+        report_dataframes = list(report_dataframes)
+        # no window held rows, so there are no columns to trim or sort on
+        report_dataframe = pd.DataFrame()
+        if report_dataframes:
+            report_dataframe = trim_report_dataframe(
+                pd.concat(report_dataframes), start, end_limit, start_column, end_column
+            ).sort_values(by=sort_by)
+        fields["rows"] = len(report_dataframe)
+
+    return report_dataframe
+
+
+def write_chunks(
+    sink,
+    report_name,
+    chunks,
+    start,
+    end_limit,
+    start_column="INTERVAL_START_GMT",
+    end_column="INTERVAL_END_GMT",
+    sort_by=["DATA_ITEM", "INTERVAL_START_GMT"],
+    checkpoint=None,
+):
+    """
+    Trims, sorts and writes each chunk to sink as it arrives.
+
+    :param sink: output sink such as pyoasis.sinks.ParquetSink
+    :param report_name: see pyoasis.utils.get_report_names()
+    :param chunks: iterable of (window, list of DataFrames, checkpointed)
+    :param start: timezone-aware datetime
+    :param end_limit: timezone-aware datetime
+    :param start_column: column name of start timestamps
+    :param end_column: column name of end timestamps
+    :param sort_by: sort order of each chunk
+    :param checkpoint: ChunkCheckpoint marking windows once written
+    """
+    for window, report_dataframes, checkpointed in chunks:
+        # checkpointed windows were written to the sink by an earlier run
+        if checkpointed:
+            continue
+        if report_dataframes:
+            report_dataframe = trim_report_dataframe(
+                pd.concat(report_dataframes),
+                start,
+                end_limit,
+                start_column,
+                end_column,
+            ).sort_values(by=sort_by)
+            with stage("sink_write", rows=len(report_dataframe)):
+                sink.write(report_name, report_dataframe)
+        if checkpoint:
+            checkpoint.save(window)
+
+
+def check_fetch_arguments(max_workers, parse_processes, resume, planner):
+    """
+    Raises ValueError for fetch_report arguments that cannot be combined.
+    """
+    if not 1 <= max_workers <= MAX_WORKERS:
+        raise ValueError("max_workers must be between 1 and {}".format(MAX_WORKERS))
+    if planner and parse_processes:
+        raise ValueError("planner cannot be combined with parse_processes")
+    if planner and resume:
+        raise ValueError("planner cannot be combined with resume")
+
+
 def fetch_report(
     report_name,
     start,
@@ -91,6 +779,19 @@ def fetch_report(
     start_column="INTERVAL_START_GMT",
     end_column="INTERVAL_END_GMT",
     sort_by=["DATA_ITEM", "INTERVAL_START_GMT"],
+    parser="xmltodict",
+    typed=False,
+    filters=None,
+    columns=None,
+    max_workers=1,
+    parse_processes=None,
+    request_interval=None,
+    client=None,
+    cache=None,
+    resume=False,
+    sink=None,
+    planner=None,
+    close_sink=True,
 ):
     """
     Fetch reports from OASIS and stitch together to create a single report
@@ -103,15 +804,54 @@ def fetch_report(
     :param chunk_size: length of report to request (timedelta)
     :param max_attempts: number of back-off attempts (int)
     :param destination_directory: directory to store temporary files
-    :param keep_temp_files: True to keep intermediary CAISO files
+    :param keep_temp_files: True to keep intermediary CAISO files, otherwise
+        the downloaded zip files are parsed in memory without touching disk
     :param timezone_: pytz.timezone object used for naive start and
         end_limit datetime objects
     :param start_column: column name of start timestamps
     :param end_column: column name of end timestamps
     :param sort_by: sort order of resultant dataframe
-    :return: DataFrame
+    :param parser: OASISReport parser ("xmltodict" or "iterparse")
+    :param typed: True to parse columns to the report's typed schema
+    :param filters: dictionary of column name to row filter applied while
+        each chunk is parsed, e.g. {"RESOURCE_NAME": re.compile("NP15")},
+        see OASISReport
+    :param columns: list of DATA columns to keep, or None for all. The
+        timestamp, sort_by and sink partition columns are always kept.
+    :param max_workers: number of chunks downloaded and parsed at the same
+        time, at most MAX_WORKERS (int)
+    :param parse_processes: number of processes parsing chunks, e.g.
+        os.cpu_count(). Chunks are then parsed on a process pool while the
+        next chunks download, instead of in the download threads. filters
+        must be picklable, e.g. regular expressions or sets rather than
+        lambdas. None to parse in the download threads.
+    :param request_interval: minimum seconds between the start of any two
+        requests to OASIS, across all workers (float). None to use the
+        request_interval of client if it sets one, otherwise
+        PARALLEL_REQUEST_INTERVAL when max_workers > 1 and 0 otherwise.
+    :param client: pyoasis.client.OASISClient shared by all chunk downloads
+        for connection pooling and retries on network errors and throttling
+    :param cache: pyoasis.cache.ChunkCache of raw chunk downloads, so chunks
+        fetched by earlier runs are not downloaded again
+    :param resume: True to checkpoint each finished chunk window in
+        destination_directory, so that a failed run restarted with the same
+        arguments only fetches the windows that are still missing. The
+        checkpoint is deleted once the CSV is written. filters must then be
+        values, collections of values or regular expressions, not functions.
+    :param sink: output sink such as pyoasis.sinks.ParquetSink. Each chunk
+        is trimmed to start and end_limit, sorted and written to the sink as
+        soon as it is parsed instead of being collected into a single CSV.
+    :param planner: pyoasis.planner.ChunkPlanner choosing the window of each
+        request instead of chunk_size. Windows grow after successes, failed
+        or truncated windows are split and fetched again, and what is
+        learned carries over to later runs. Cannot be combined with
+        parse_processes, or with resume since planned windows depend on
+        what the planner has learned and differ between runs.
+    :param close_sink: False to leave sink open and return it, e.g. when
+        several fetch_report calls write to the same sink
+    :return: CSV filename, or the result of sink.close() when a sink is given
     """
-    report_dataframe = pd.DataFrame()
+    check_fetch_arguments(max_workers, parse_processes, resume, planner)
 
     # localize naive datetime
     if not start.tzinfo:
@@ -119,46 +859,282 @@ def fetch_report(
     if not end_limit.tzinfo:
         end_limit = timezone_.localize(end_limit)
 
-    chunk_start = start
-    chunk_end = chunk_start + chunk_size
-    while chunk_end < end_limit + chunk_size:
-        url = create_oasis_url(
+    # columns needed to trim, sort and partition the chunks
+    columns = with_required_columns(
+        columns,
+        [start_column, end_column] + sort_by + getattr(sink, "partition_cols", []),
+    )
+
+    if request_interval is None and getattr(client, "request_interval", None) is None:
+        request_interval = default_request_interval(request_interval, max_workers)
+
+    download_arguments = dict(
+        max_attempts=max_attempts,
+        destination_directory=destination_directory,
+        keep_temp_files=keep_temp_files,
+        throttle=RequestThrottle(request_interval) if request_interval else None,
+        client=client,
+        cache=cache,
+    )
+
+    checkpoint = None
+    if resume:
+        checkpoint = ChunkCheckpoint.for_run(
+            destination_directory,
             report_name=report_name,
-            start=chunk_start,
-            end=chunk_end,
+            start=start,
+            end_limit=end_limit,
             query_params=query_params,
+            chunk_size=chunk_size,
+            parser=parser,
+            typed=typed,
+            filters=filters,
+            columns=columns,
         )
-        file_locations = download_files(
-            url=url,
-            destination_directory=destination_directory,
-            max_attempts=max_attempts,
+
+    def fetch_window(window):
+        if checkpoint and window in checkpoint:
+            return window, checkpoint.load(window), True
+
+        if planner:
+            report_dataframes = fetch_planned_chunk(
+                planner,
+                report_name,
+                window[0],
+                window[1],
+                query_params,
+                start_column,
+                end_column,
+                parser,
+                typed,
+                filters,
+                columns,
+                **download_arguments
+            )
+            return window, report_dataframes, False
+
+        source = download_chunk(
+            report_name, window[0], window[1], query_params, **download_arguments
         )
-        for file_location in file_locations:
-            oasis_report = OASISReport(file_location)
-            if hasattr(oasis_report, "report_dataframe"):
-                report_dataframe = report_dataframe.append(
-                    oasis_report.report_dataframe
-                )
-            if not keep_temp_files:
-                os.remove(file_location)
+        # with parse_processes, chunks are parsed by parse_pipelined
+        if parse_processes:
+            return window, source, False
 
-        chunk_start = chunk_end
-        chunk_end = chunk_end + chunk_size
+        return window, parse_chunk(source, parser, typed, filters, columns), False
 
-    report_dataframe[start_column] = pd.to_datetime(report_dataframe[start_column])
-    report_dataframe[end_column] = pd.to_datetime(report_dataframe[end_column])
+    if planner:
+        windows = planned_windows(
+            start, end_limit, partial(planner.chunk_size, report_name, query_params)
+        )
+    else:
+        windows = chunk_windows(start, end_limit, chunk_size)
 
-    report_dataframe = report_dataframe[
-        (report_dataframe[start_column] >= start)
-        & (report_dataframe[end_column] <= end_limit)
-    ].sort_values(by=sort_by)
+    # chunks arrive in time order regardless of completion order
+    chunks = imap_ordered(
+        partial(
+            observe_chunk, fetch_window, report_name, count_rows=not parse_processes
+        ),
+        windows,
+        max_workers,
+    )
+    if parse_processes:
+        chunks = parse_pipelined(
+            chunks,
+            partial(
+                parse_chunk,
+                parser=parser,
+                typed=typed,
+                filters=filters,
+                columns=columns,
+            ),
+            parse_processes,
+        )
+
+    if sink:
+        write_chunks(
+            sink,
+            report_name,
+            chunks,
+            start,
+            end_limit,
+            start_column,
+            end_column,
+            sort_by,
+            checkpoint,
+        )
+        if checkpoint:
+            checkpoint.remove()
+
+        return sink.close() if close_sink else sink
+
+    report_dataframes = []
+    for window, chunk_dataframes, checkpointed in chunks:
+        report_dataframes += chunk_dataframes
+        if checkpoint and not checkpointed:
+            checkpoint.save(window, chunk_dataframes)
 
+    report_dataframe = stitch_report_dataframes(
+        report_dataframes=report_dataframes,
+        start=start,
+        end_limit=end_limit,
+        start_column=start_column,
+        end_column=end_column,
+        sort_by=sort_by,
+    )
+
+    filename = write_report_csv(
+        report_dataframe, report_name, start, end_limit, destination_directory
+    )
+
+    if checkpoint:
+        checkpoint.remove()
+
+    return filename
+
+
+def write_report_csv(
+    report_dataframe, report_name, start, end_limit, destination_directory
+):
+    """
+    Writes a stitched report to a CSV file named after its range and report.
+
+    :param report_dataframe: DataFrame
+    :param report_name: see pyoasis.utils.get_report_names()
+    :param start: datetime
+    :param end_limit: datetime
+    :param destination_directory: directory of the CSV file
+    :return: CSV filename
+    """
     filename = "{}_{}_{}.csv".format(
         start.strftime(format="%Y%m%d-%M%H"),
         end_limit.strftime(format="%Y%m%d-%M%H"),
         report_name,
     )
     filename = os.path.join(os.path.abspath(destination_directory), filename)
-    report_dataframe.to_csv(filename)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with stage("write_csv", rows=len(report_dataframe)):
+        report_dataframe.to_csv(filename)
 
     return filename
+
+
+def intersect_filters(filters, node_filters):
+    """
+    Combines row filters with the node filters of a NodePlan. A filter on a
+    column that also has a node filter keeps only the nodes it matches, so
+    the result stays a picklable collection of node names.
+
+    :param filters: dictionary of column name to filter, see
+        pyoasis.utils.compile_filters, or None
+    :param node_filters: dictionary of column name to collection of nodes
+    :return: dictionary of column name to filter
+    """
+    filters = dict(filters or {})
+    for column, nodes in node_filters.items():
+        if column in filters:
+            keep = compile_filters({column: filters[column]})[column]
+            nodes = {x for x in nodes if keep(x)}
+        filters[column] = nodes
+
+    return filters
+
+
+def fetch_nodes(
+    report_name,
+    nodes,
+    start,
+    end_limit,
+    query_params,
+    node_planner=None,
+    destination_directory="caiso_downloads",
+    timezone_=timezone("US/Pacific"),
+    sort_by=["DATA_ITEM", "INTERVAL_START_GMT"],
+    filters=None,
+    sink=None,
+    resume=False,
+    **fetch_arguments
+):
+    """
+    Fetches a report for a list of nodes with the plan chosen by
+    node_planner: one request per node, comma-separated batches of nodes or
+    ALL_APNODES requests filtered locally to the nodes, whichever moves the
+    fewest bytes and requests. Each request of the plan is run by
+    fetch_report.
+
+    :param report_name: see pyoasis.utils.get_report_names()
+    :param nodes: node names (list of strings)
+    :param start: datetime
+    :param end_limit: datetime
+    :param query_params: see pyoasis.utils.get_report_params(), without node
+        or grp_type
+    :param node_planner: pyoasis.planner.NodePlanner, defaults to one with
+        default settings
+    :param destination_directory: see fetch_report
+    :param timezone_: pytz.timezone object used for naive start and
+        end_limit datetime objects
+    :param sort_by: sort order of resultant dataframe
+    :param filters: row filters, see fetch_report; the plan adds a filter on
+        the nodes to ALL_APNODES requests, intersected with any filter on
+        the same column
+    :param sink: output sink such as pyoasis.sinks.ParquetSink, see
+        fetch_report
+    :param resume: see fetch_report; requires a sink, since windows finished
+        by an earlier run are only kept by the sink
+    :param fetch_arguments: other arguments of fetch_report, e.g. client,
+        cache or max_workers. chunk_size is chosen by the plan and cannot be
+        passed.
+    :return: CSV filename, or the result of sink.close() when a sink is given
+    """
+    if resume and sink is None:
+        raise ValueError("resume requires a sink")
+    if "chunk_size" in fetch_arguments:
+        raise ValueError(
+            "chunk_size is chosen by the node plan; set max_node_window or "
+            "max_group_window of the NodePlanner instead"
+        )
+    if "close_sink" in fetch_arguments:
+        raise ValueError("fetch_nodes closes the sink itself")
+
+    # localize naive datetime
+    if not start.tzinfo:
+        start = timezone_.localize(start)
+    if not end_limit.tzinfo:
+        end_limit = timezone_.localize(end_limit)
+
+    node_planner = node_planner or NodePlanner()
+    plan = node_planner.plan(report_name, nodes, start, end_limit, query_params)
+    emit(
+        "node_plan",
+        report_name=report_name,
+        strategy=plan.strategy,
+        requests=plan.requests,
+        estimated_bytes=plan.bytes,
+    )
+
+    target = sink or MemorySink()
+    for plan_query_params in plan.query_params:
+        fetch_report(
+            report_name,
+            start,
+            end_limit,
+            plan_query_params,
+            chunk_size=plan.chunk_size,
+            destination_directory=destination_directory,
+            sort_by=sort_by,
+            filters=intersect_filters(filters, plan.filters),
+            sink=target,
+            resume=resume,
+            close_sink=False,
+            **fetch_arguments
+        )
+
+    if sink:
+        return sink.close()
+
+    report_dataframe = target.close()
+    if not report_dataframe.empty:
+        report_dataframe = report_dataframe.sort_values(by=sort_by)
+
+    return write_report_csv(
+        report_dataframe, report_name, start, end_limit, destination_directory
+    )
@@ -1,22 +1,308 @@
 from cached_property import cached_property
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import glob
+import io
 import itertools
+import os
+import numpy as np
 import pandas as pd
+from pytz import timezone
 import xmltodict
+from zipfile import ZipFile
 
-from .utils import xml_to_dict
+from .metrics import stage
+from .parallel import parse_packed, unpack_dataframe
+from .utils import (
+    OASIS_DATETIME_FORMAT,
+    apply_report_schema,
+    filter_data,
+    get_report_schema,
+    iterparse_xml,
+    open_zip_members,
+    read_report_metadata,
+    report_metadata,
+    xml_to_dict,
+)
+from .xml_writer import (
+    dataframe_items,
+    dict_items,
+    iter_report_xml,
+    write_text,
+)
+
+PARSERS = ["xmltodict", "iterparse"]
+
+# report_dataframe columns indexed on first use by OASISReport.query
+INDEX_COLUMNS = ["RESOURCE_NAME", "DATA_ITEM"]
+
+EMPTY_POSITIONS = np.array([], dtype=np.intp)
+
+# columns sharing one categorical dictionary across files in from_paths
+SHARED_CATEGORY_COLUMNS = ["RESOURCE_NAME", "DATA_ITEM"]
+
+# file types read by from_directory
+REPORT_FILE_EXTENSIONS = (".xml", ".zip")
 
 
 class OASISReport:
-    def __init__(self, xml_path):
-        self.xml_path = xml_path
-        self.filters = []
+    def __init__(
+        self,
+        xml_path,
+        parser="xmltodict",
+        typed=False,
+        filters=None,
+        columns=None,
+        lazy=False,
+        normalize=True,
+    ):
+        """
+        :param xml_path: path to XML file or file-like object, e.g. a
+            member opened from a downloaded ZipFile
+        :param parser: "xmltodict" to parse the full document tree into
+            self.report_dict or "iterparse" to stream DATA elements straight
+            into self.report_dataframe, which uses far less memory on large
+            reports. With "iterparse", self.report_dict only holds the
+            report skeleton without DATA elements.
+        :param typed: True to convert self.report_dataframe columns from
+            strings to the dtypes of the report's schema (see
+            pyoasis.utils.get_report_schema), e.g. float64 VALUE, Int16
+            INTERVAL_NUM, UTC datetimes and categorical RESOURCE_NAME
+        :param filters: dictionary of column name to row filter applied while
+            the report is read, e.g. {"RESOURCE_NAME": re.compile("NP15")},
+            see pyoasis.utils.compile_filters. Filters match the raw string
+            values of the XML. With "iterparse", rows failing the filters are
+            never materialized.
+        :param columns: list of DATA columns to keep, or None for all
+        :param lazy: True to defer parsing to the first access of
+            self.report_dict or self.report_dataframe, e.g. to read only
+            self.metadata. A file-like xml_path must then stay open until
+            the report is parsed.
+        :param normalize: False to keep self.report_dict exactly as read by
+            xmltodict, without normalize_report_dict or
+            self.report_dataframe, e.g. to time normalize_report_dict and
+            to_dataframe separately. Only with parser="xmltodict".
+        """
+        if parser not in PARSERS:
+            raise ValueError("parser must be one of {}".format(PARSERS))
+        if not normalize and parser != "xmltodict":
+            raise ValueError('normalize=False requires parser="xmltodict"')
 
-        self.report_dict = xml_to_dict(xml_path)
+        self.xml_path = getattr(xml_path, "name", xml_path)
+        self.parser = parser
+        self.typed = typed
+        self.filters = [filters] if filters else []
+        self.time_indexes = {}
 
-        if not self.error_key:
-            self.normalize_report_dict()
-            self.report_dataframe = self.to_dataframe()
+        self._source = (xml_path, filters, columns, normalize)
+        if not lazy:
+            self.parse()
+
+    @classmethod
+    def from_paths(
+        cls,
+        paths,
+        parser="iterparse",
+        typed=False,
+        filters=None,
+        columns=None,
+        processes=os.cpu_count(),
+        category_columns=SHARED_CATEGORY_COLUMNS,
+    ):
+        """
+        Reads many XML reports, or zip files of XML reports, on a process
+        pool and returns their DATA as a single DataFrame. Reports holding an
+        ERROR or no rows are skipped. category_columns are converted to
+        categoricals as each file is read and recoded to one shared set of
+        categories, so each node name or DATA_ITEM is stored once however
+        many files it appears in, and all frames are joined with a single
+        concat.
+
+        :param paths: iterable of XML or zip file paths
+        :param parser: see OASISReport
+        :param typed: see OASISReport
+        :param filters: see OASISReport, must be picklable with processes > 1,
+            e.g. regular expressions or sets rather than lambdas
+        :param columns: see OASISReport
+        :param processes: number of files read at the same time (int), 1 to
+            read them in the current process
+        :param category_columns: columns stored as shared categoricals
+        :return: pandas.DataFrame
+        """
+        read = partial(
+            _read_report_dataframes,
+            parser=parser,
+            typed=typed,
+            filters=filters,
+            columns=columns,
+            category_columns=category_columns,
+        )
+        with stage("read_files") as fields:
+            if processes == 1:
+                report_dataframes = [y for x in paths for y in read(x)]
+            else:
+                with ProcessPoolExecutor(processes) as executor:
+                    report_dataframes = [
+                        unpack_dataframe(y)
+                        for x in executor.map(
+                            partial(parse_packed, read), paths
+                        )
+                        for y in x
+                    ]
+            fields["rows"] = sum(len(x) for x in report_dataframes)
+        if not report_dataframes:
+            return pd.DataFrame()
+
+        for column in category_columns:
+            if not all(column in x for x in report_dataframes):
+                continue
+            categories = (
+                pd.Index(
+                    np.concatenate(
+                        [
+                            x[column].cat.categories.to_numpy()
+                            for x in report_dataframes
+                        ]
+                    )
+                )
+                .unique()
+                .sort_values()
+            )
+            for report_dataframe in report_dataframes:
+                report_dataframe[column] = report_dataframe[
+                    column
+                ].cat.set_categories(categories)
+
+        with stage("concat") as fields:
+            report_dataframe = pd.concat(report_dataframes, ignore_index=True)
+            fields["rows"] = len(report_dataframe)
+
+        return report_dataframe
+
+    @classmethod
+    def from_directory(cls, directory, pattern="**/*", **arguments):
+        """
+        Reads every XML and zip file in directory matching pattern, see
+        from_paths.
+
+        :param directory: (string)
+        :param pattern: glob pattern of the files, relative to directory
+        :param arguments: keyword arguments of from_paths
+        :return: pandas.DataFrame
+        """
+        paths = [
+            x
+            for x in sorted(
+                glob.glob(os.path.join(directory, pattern), recursive=True)
+            )
+            if x.lower().endswith(REPORT_FILE_EXTENSIONS)
+        ]
+
+        return cls.from_paths(paths, **arguments)
+
+    def parse(self):
+        """
+        Parses the XML report into self.report_dict and
+        self.report_dataframe. Reports opened with lazy=True are parsed on
+        first access of either; does nothing once the report is parsed.
+        """
+        if self.parsed:
+            return
+        xml_path, filters, columns, normalize = self._source
+
+        if self.parser == "iterparse":
+            with stage("parse_xml", parser=self.parser):
+                (
+                    self.report_dict,
+                    report_columns,
+                    self.item_sizes,
+                ) = iterparse_xml(xml_path, filters, columns)
+            if not self.error_key:
+                with stage("to_dataframe") as fields:
+                    report_dataframe = pd.DataFrame(report_columns)
+                    fields["rows"] = len(report_dataframe)
+                self.report_dataframe = self.apply_schema(report_dataframe)
+        else:
+            with stage("parse_xml", parser=self.parser):
+                self.report_dict = xml_to_dict(xml_path)
+            if normalize and not self.error_key:
+                with stage("normalize"):
+                    self.normalize_report_dict()
+                    if filters or columns is not None:
+                        self.select_data(filters, columns)
+                with stage("to_dataframe") as fields:
+                    report_dataframe = self.to_dataframe()
+                    fields["rows"] = len(report_dataframe)
+                self.report_dataframe = self.apply_schema(report_dataframe)
+
+        self._source = None
+
+    @property
+    def parsed(self):
+        """
+        True once the XML report is parsed, see parse.
+        """
+        return "report_dict" in self.__dict__
+
+    def _parsed_attribute(self, name):
+        """
+        Returns an attribute set by parse, parsing the report first.
+        """
+        self.parse()
+        if name not in self.__dict__:
+            raise AttributeError(
+                "'OASISReport' object has no attribute '{}'".format(name)
+            )
+
+        return self.__dict__[name]
+
+    @cached_property
+    def report_dict(self):
+        """
+        Report as an xmltodict-style dictionary, see parse.
+        """
+        return self._parsed_attribute("report_dict")
+
+    @cached_property
+    def report_dataframe(self):
+        """
+        Report DATA as a pandas.DataFrame, see parse. Not set on ERROR
+        reports.
+        """
+        return self._parsed_attribute("report_dataframe")
+
+    @cached_property
+    def item_sizes(self):
+        """
+        Number of rows of each ITEM, with parser="iterparse" only.
+        """
+        return self._parsed_attribute("item_sizes")
+
+    @cached_property
+    def metadata(self):
+        """
+        pyoasis.utils.ReportMetadata of the report. Read from the first few
+        kilobytes of the XML file when the report is not parsed yet, so
+        listing the name, market, dates or error of a lazy report never
+        parses its DATA.
+        """
+        if not self.parsed:
+            return read_report_metadata(self._source[0])
+
+        message_header = {}
+        for key, value in self.report_dict[self.master_key].items():
+            if key.split(":")[-1] == "MessageHeader":
+                message_header = {
+                    x.split(":")[-1]: y for x, y in value.items()
+                }
+
+        return report_metadata(
+            self.xml_path,
+            message_header.get("TimeDate"),
+            self.report_header,
+            self.error,
+        )
 
     def __repr__(self):
         return self.__str__()
@@ -74,6 +360,26 @@ class OASISReport:
 
         return None
 
+    @cached_property
+    def error(self):
+        """
+        (ERR_CODE, ERR_DESC) if ERROR exists in report, otherwise None.
+        Read from self.metadata when the report is not parsed yet.
+        """
+        if not self.parsed:
+            return self.metadata.error
+        if not self.error_key:
+            return None
+
+        error = self.report_dict[self.master_key][self.payload_key][
+            self.rto_key
+        ][self.error_key]
+        if isinstance(error, list):
+            error = error[0]
+        error = {x.split(":")[-1]: y for x, y in error.items()}
+
+        return error.get("ERR_CODE"), error.get("ERR_DESC")
+
     @cached_property
     def item_key(self):
         """
@@ -113,6 +419,42 @@ class OASISReport:
 
         return None
 
+    @cached_property
+    def report_header(self):
+        """
+        REPORT_HEADER of the first item as a dictionary, without namespace
+        prefixes, or None.
+        """
+        if self.error_key:
+            return None
+
+        items = self.report_dict[self.master_key][self.payload_key][
+            self.rto_key
+        ][self.item_key]
+        if isinstance(items, list):
+            items = items[0]
+
+        for key, header in items.items():
+            if "HEADER" not in key:
+                continue
+            if isinstance(header, list):
+                header = header[0]
+            return OrderedDict(
+                (x.split(":")[-1], y) for x, y in header.items()
+            )
+
+        return None
+
+    @cached_property
+    def report_name(self):
+        """
+        Report name from the REPORT_HEADER of the first item.
+        """
+        if not self.parsed:
+            return self.metadata.report_name
+
+        return (self.report_header or {}).get("REPORT")
+
     @property
     def flattened_report_dict(self):
         """
@@ -194,44 +536,274 @@ class OASISReport:
             item_key
         ] = updated_items
 
+    def select_data(self, filters=None, columns=None):
+        """
+        Drops DATA elements of self.report_dict failing filters, and DATA
+        values of columns not in columns. See pyoasis.utils.filter_data.
+
+        :param filters: dictionary of column name to row filter
+        :param columns: list of DATA columns to keep, or None for all
+        """
+        master_key = self.master_key
+        payload_key = self.payload_key
+        rto_key = self.rto_key
+        item_key = self.item_key
+        data_key = self.data_key
+
+        self.report_dict[master_key][payload_key][rto_key][item_key] = [
+            OrderedDict(
+                (x, filter_data(y, filters, columns) if x == data_key else y)
+                for x, y in item.items()
+            )
+            for item in self.report_dict[master_key][payload_key][rto_key][
+                item_key
+            ]
+        ]
+
     def filter_report_dict(self, search_key, search_values=[]):
         """
         Filters message by search_key matching search_values. Updates
         self.report_dict and self.report_dataframe with updated values.
 
+        To filter without changing the report, see self.query.
+
         :param search_key: key to search on
         :param search_values: list of values to match
         """
+        positions = self.query_positions({search_key: search_values})
+
+        # DATA elements only exist in self.report_dataframe with iterparse
+        if self.parser != "iterparse":
+            self.report_dict = self.select_report_dict(positions)
+        else:
+            self.item_sizes = self.select_item_sizes(positions)
+        self.report_dataframe = self.report_dataframe.iloc[
+            positions
+        ].reset_index(drop=True)
+        self.filters.append({search_key: search_values})
+
+        # row positions changed, rebuild indexes on next query
+        self.__dict__.pop("index", None)
+        self.time_indexes = {}
+
+    @cached_property
+    def index(self):
+        """
+        Row positions of self.report_dataframe by value, for each of the
+        INDEX_COLUMNS in the report. Built on first use.
+        """
+        report_dataframe = self.report_dataframe
+
+        return {
+            column: report_dataframe.groupby(
+                column, sort=False, observed=True
+            ).indices
+            for column in INDEX_COLUMNS
+            if column in report_dataframe.columns
+        }
+
+    def time_index(self, column):
+        """
+        Returns the values of a timestamp column as sorted numpy datetimes in
+        UTC, along with their row positions. Built on first use per column.
+
+        :param column: column name of timestamps, e.g. INTERVAL_START_GMT
+        :return: (sorted datetime64 array, row positions array)
+        """
+        if column not in self.time_indexes:
+            values = self.report_dataframe[column]
+            if not pd.api.types.is_datetime64_any_dtype(values):
+                values = pd.to_datetime(
+                    values, format=OASIS_DATETIME_FORMAT, utc=True
+                )
+            values = values.values
+            order = np.argsort(values, kind="stable")
+            self.time_indexes[column] = (values[order], order)
+
+        return self.time_indexes[column]
+
+    def query_positions(
+        self,
+        predicates,
+        start=None,
+        end=None,
+        start_column="INTERVAL_START_GMT",
+        timezone_=timezone("US/Pacific"),
+        positions=None,
+    ):
+        """
+        Returns the sorted row positions of self.report_dataframe matching
+        all predicates and the time range. See self.query.
+
+        :param predicates: dictionary of column name to a value or list of
+            values
+        :param start: datetime
+        :param end: datetime
+        :param start_column: column name of start timestamps
+        :param timezone_: pytz.timezone object used for naive start and end
+            datetime objects
+        :param positions: row positions to narrow down, all rows if None
+        :return: numpy array of row positions
+        """
+        report_dataframe = self.report_dataframe
+
+        for column, values in predicates.items():
+            if isinstance(values, str) or not hasattr(values, "__iter__"):
+                values = [values]
+            if column in self.index:
+                matches = np.unique(
+                    np.concatenate(
+                        [
+                            self.index[column].get(x, EMPTY_POSITIONS)
+                            for x in values
+                        ]
+                        + [EMPTY_POSITIONS]
+                    )
+                )
+            else:
+                matches = np.flatnonzero(report_dataframe[column].isin(values))
+            positions = (
+                matches
+                if positions is None
+                else np.intersect1d(positions, matches, assume_unique=True)
+            )
+
+        if start is not None or end is not None:
+            timestamps, order = self.time_index(start_column)
+            first = 0
+            last = len(timestamps)
+            if start is not None:
+                first = timestamps.searchsorted(
+                    _to_utc_datetime64(start, timezone_)
+                )
+            if end is not None:
+                last = timestamps.searchsorted(
+                    _to_utc_datetime64(end, timezone_)
+                )
+            matches = np.sort(order[first:last])
+            positions = (
+                matches
+                if positions is None
+                else np.intersect1d(positions, matches, assume_unique=True)
+            )
+
+        if positions is None:
+            positions = np.arange(len(report_dataframe))
+
+        return positions
+
+    def query(
+        self,
+        start=None,
+        end=None,
+        start_column="INTERVAL_START_GMT",
+        timezone_=timezone("US/Pacific"),
+        **predicates
+    ):
+        """
+        Returns a view of the rows matching all predicates without changing
+        the report, e.g.
+
+            report.query(RESOURCE_NAME=["TH_NP15_GEN-APND"], DATA_ITEM="LMP_PRC")
+
+        Predicates on INDEX_COLUMNS are answered from self.index and time
+        ranges from self.time_index, so repeated queries do not rescan the
+        report.
+
+        :param start: datetime, selects rows with start_column >= start
+        :param end: datetime, selects rows with start_column < end
+        :param start_column: column name of start timestamps
+        :param timezone_: pytz.timezone object used for naive start and end
+            datetime objects
+        :param predicates: column name to a value or list of values
+        :return: OASISReportView
+        """
+        positions = self.query_positions(
+            predicates, start, end, start_column, timezone_
+        )
+
+        return OASISReportView(
+            self, positions, [_describe_query(predicates, start, end)]
+        )
+
+    def select_report_dict(self, positions):
+        """
+        Returns a copy of self.report_dict holding only the DATA elements of
+        the given self.report_dataframe row positions. Items without any
+        selected DATA are dropped. self.report_dict is not changed.
+
+        :param positions: row positions of self.report_dataframe
+        :return: OrderedDict
+        """
+        if self.parser == "iterparse":
+            raise ValueError("report_dict has no DATA with parser='iterparse'")
+
         master_key = self.master_key
         payload_key = self.payload_key
         rto_key = self.rto_key
         item_key = self.item_key
         data_key = self.data_key
 
-        # filter data on search criteria
+        selected = np.zeros(len(self.report_dataframe), dtype=bool)
+        selected[positions] = True
+
+        # keep selected data, rows are in report_dict order
         item_list = []
+        row = 0
         for item in self.report_dict[master_key][payload_key][rto_key][
             item_key
         ]:
-            data_list = []
-            for data in item[data_key]:
-                if data[search_key] in search_values:
-                    data_list.append(data)
-            item_list.append({data_key: data_list})
+            data_list = [
+                x
+                for x, y in zip(
+                    item[data_key], selected[row : row + len(item[data_key])]
+                )
+                if y
+            ]
+            row += len(item[data_key])
+            if data_list:
+                item_list.append(
+                    OrderedDict(
+                        (x, data_list if x == data_key else y)
+                        for x, y in item.items()
+                    )
+                )
 
-        # update report_dict and report_dataframe
-        self.report_dict[master_key][payload_key][rto_key][
-            item_key
-        ] = item_list
-        self.report_dataframe = self.to_dataframe()
-        self.filters.append({search_key: search_values})
+        # copy the levels above the items
+        report_dict = OrderedDict(self.report_dict)
+        report_dict[master_key] = OrderedDict(report_dict[master_key])
+        report_dict[master_key][payload_key] = OrderedDict(
+            report_dict[master_key][payload_key]
+        )
+        report_dict[master_key][payload_key][rto_key] = OrderedDict(
+            report_dict[master_key][payload_key][rto_key]
+        )
+        report_dict[master_key][payload_key][rto_key][item_key] = item_list
+
+        return report_dict
 
     def to_dataframe(self):
         """
         Returns self.report_dict as a pandas Dataframe.
         """
+        if self.parser == "iterparse":
+            raise ValueError("report_dict has no DATA with parser='iterparse'")
+
         return pd.DataFrame(self.flattened_report_dict)
 
+    def apply_schema(self, report_dataframe):
+        """
+        Returns report_dataframe converted to the report's schema if
+        self.typed, otherwise report_dataframe unchanged.
+        """
+        if not self.typed:
+            return report_dataframe
+
+        with stage("apply_schema"):
+            return apply_report_schema(
+                report_dataframe, get_report_schema(self.report_name)
+            )
+
     @property
     def dataframe_columns(self):
         """
@@ -245,8 +817,232 @@ class OASISReport:
         """
         return getattr(self.report_dataframe, dataframe_column).unique()
 
+    def select_item_sizes(self, positions):
+        """
+        Returns self.item_sizes counting only the rows at positions, with
+        parser="iterparse".
+
+        :param positions: sorted row positions of self.report_dataframe
+        :return: numpy array of the number of rows of each item
+        """
+        item_sizes = self.item_sizes
+
+        return np.bincount(
+            np.repeat(np.arange(len(item_sizes)), item_sizes)[positions],
+            minlength=len(item_sizes),
+        )
+
+    def write_xml(self, destination, positions=None):
+        """
+        Streams the report as XML to destination, one item at a time, without
+        building the XML document in memory. With "xmltodict", DATA is
+        written as parsed from the original XML; with "iterparse", it is
+        written from self.report_dataframe within the report skeleton.
+
+        :param destination: file path or file-like object, text or binary
+        :param positions: row positions of self.report_dataframe to include,
+            all rows if None
+        """
+        if self.error_key:
+            items = []
+        elif self.parser == "iterparse":
+            item_sizes = self.item_sizes
+            report_dataframe = self.report_dataframe
+            if positions is not None:
+                item_sizes = self.select_item_sizes(positions)
+                report_dataframe = report_dataframe.iloc[positions]
+            items = dataframe_items(
+                report_dataframe, self.report_dict, item_sizes
+            )
+        else:
+            selected = None
+            if positions is not None:
+                selected = np.zeros(len(self.report_dataframe), dtype=bool)
+                selected[positions] = True
+            items = dict_items(self.report_dict, selected)
+
+        with stage("write_xml"):
+            write_text(destination, iter_report_xml(self.report_dict, items))
+
+    def to_xml(self, positions=None):
+        """
+        Returns self.report_dict as XML. With "iterparse", the XML is written
+        from self.report_dataframe, see write_xml.
+
+        :param positions: row positions of self.report_dataframe to include,
+            all rows if None
+        """
+        if self.parser == "iterparse":
+            xml = io.StringIO()
+            self.write_xml(xml, positions)
+            return xml.getvalue()
+
+        if positions is None:
+            return xmltodict.unparse(self.report_dict, pretty=True)
+
+        return xmltodict.unparse(
+            self.select_report_dict(positions), pretty=True
+        )
+
+
+class OASISReportView:
+    """
+    Filtered view of an OASISReport as returned by OASISReport.query. A view
+    only holds row positions into the report's report_dataframe; the report
+    itself is never changed, so any number of views can be taken from it.
+    """
+
+    def __init__(self, report, positions, filters):
+        """
+        :param report: OASISReport
+        :param positions: sorted row positions of report.report_dataframe
+        :param filters: list of query descriptions
+        """
+        self.report = report
+        self.positions = positions
+        self.filters = filters
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return (
+            "OASISReportView: "
+            + self.report.xml_path
+            + " filtered on "
+            + str(self.report.filters + self.filters)
+        )
+
+    def __len__(self):
+        return len(self.positions)
+
+    @cached_property
+    def report_dataframe(self):
+        """
+        Rows of the report's report_dataframe in the view, keeping the
+        report's row labels.
+        """
+        return self.report.report_dataframe.iloc[self.positions]
+
+    @property
+    def dataframe_columns(self):
+        """
+        Return dataframe columns.
+        """
+        return self.report.report_dataframe.columns
+
+    def query(
+        self,
+        start=None,
+        end=None,
+        start_column="INTERVAL_START_GMT",
+        timezone_=timezone("US/Pacific"),
+        **predicates
+    ):
+        """
+        Returns a view of the rows of this view matching all predicates. See
+        OASISReport.query.
+
+        :return: OASISReportView
+        """
+        positions = self.report.query_positions(
+            predicates, start, end, start_column, timezone_, self.positions
+        )
+
+        return OASISReportView(
+            self.report,
+            positions,
+            self.filters + [_describe_query(predicates, start, end)],
+        )
+
+    def get_unique_values(self, dataframe_column):
+        """
+        Return unique values from a dataframe_column.
+        """
+        return getattr(self.report_dataframe, dataframe_column).unique()
+
     def to_xml(self):
         """
-        Returns self.report_dict as XML.
+        Returns the report's XML holding only the DATA in the view.
+        """
+        return self.report.to_xml(self.positions)
+
+    def write_xml(self, destination):
         """
-        return xmltodict.unparse(self.report_dict, pretty=True)
+        Streams the report's XML holding only the DATA in the view to
+        destination. See OASISReport.write_xml.
+
+        :param destination: file path or file-like object, text or binary
+        """
+        self.report.write_xml(destination, self.positions)
+
+
+def _read_report_dataframes(
+    path,
+    parser="iterparse",
+    typed=False,
+    filters=None,
+    columns=None,
+    category_columns=SHARED_CATEGORY_COLUMNS,
+):
+    """
+    Reads the DATA of an XML report, or of each report in a zip file, with
+    category_columns converted to categoricals. Used by
+    OASISReport.from_paths.
+
+    :return: list of DataFrames
+    """
+    if path.lower().endswith(".zip"):
+        with ZipFile(path) as zipfile:
+            oasis_reports = [
+                OASISReport(x, parser, typed, filters, columns)
+                for x in open_zip_members(zipfile)
+            ]
+    else:
+        oasis_reports = [OASISReport(path, parser, typed, filters, columns)]
+
+    report_dataframes = []
+    for oasis_report in oasis_reports:
+        if oasis_report.error_key or oasis_report.report_dataframe.empty:
+            continue
+        report_dataframe = oasis_report.report_dataframe
+        report_dataframes.append(
+            report_dataframe.assign(
+                **{
+                    x: report_dataframe[x].astype("category")
+                    for x in category_columns
+                    if x in report_dataframe
+                }
+            )
+        )
+
+    return report_dataframes
+
+
+def _to_utc_datetime64(datetime_, timezone_):
+    """
+    Converts a datetime object to a naive numpy datetime64 in UTC, localizing
+    naive datetime objects to timezone_.
+    """
+    if not datetime_.tzinfo:
+        datetime_ = timezone_.localize(datetime_)
+
+    return (
+        pd.Timestamp(datetime_)
+        .tz_convert("UTC")
+        .tz_localize(None)
+        .to_datetime64()
+    )
+
+
+def _describe_query(predicates, start, end):
+    """
+    Returns a query as a dictionary for OASISReportView.filters.
+    """
+    description = dict(predicates)
+    if start is not None:
+        description["start"] = start
+    if end is not None:
+        description["end"] = end
+
+    return description
@@ -0,0 +1,456 @@
+import os
+import pandas as pd
+from pytz import timezone
+import shutil
+import uuid
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# columns holding the values of a report; all other columns identify a row
+VALUE_COLUMNS = ["VALUE"]
+
+# running statistics kept by AggregateSink, and MEAN derived from them
+ACCUMULATORS = ["SUM", "COUNT", "MIN", "MAX", "LAST"]
+STATISTICS = ["MEAN"] + ACCUMULATORS
+
+
+def report_key_columns(report_dataframe, key_columns=None):
+    """
+    Returns the columns identifying a row of a report. Reports are keyed by
+    different columns, e.g. RESOURCE_NAME for PRC_LMP but ANC_TYPE and
+    ANC_REGION for PRC_AS, so by default every column that is not one of
+    VALUE_COLUMNS is part of the key.
+
+    :param report_dataframe: DataFrame of a report
+    :param key_columns: list of columns, or None for every column of
+        report_dataframe except VALUE_COLUMNS
+    :return: list of columns
+    """
+    if key_columns is None:
+        return [x for x in report_dataframe.columns if x not in VALUE_COLUMNS]
+
+    missing = [x for x in key_columns if x not in report_dataframe.columns]
+    if missing:
+        raise ValueError("key columns missing from report: {}".format(missing))
+
+    return list(key_columns)
+
+
+class ParquetSink:
+    """
+    Output sink for pyoasis.repeat_calls.fetch_report that appends each
+    parsed chunk to an on-disk Parquet dataset as soon as it arrives, instead
+    of growing a single DataFrame. Peak memory is one chunk, and the dataset
+    is hive-partitioned by report and operating date:
+
+        directory/REPORT=<report_name>/OPR_DATE=<yyyy-mm-dd>/part-*.parquet
+
+    Downstream jobs can read only the partitions they need, e.g. with
+    pandas.read_parquet(directory, filters=[("OPR_DATE", ">=", "2020-06-01")]).
+    """
+
+    def __init__(
+        self, directory, partition_cols=["OPR_DATE"], sort_by=None, row_group_size=None
+    ):
+        """
+        :param directory: root directory of the dataset (string)
+        :param partition_cols: columns to partition by below REPORT; columns
+            missing from a report are skipped
+        :param sort_by: columns merged partitions are sorted by, so that row
+            group statistics can be used to skip row groups when reading
+        :param row_group_size: maximum rows per row group of merged
+            partitions, or None for the pyarrow default
+        """
+        if pyarrow is None:
+            raise ImportError("ParquetSink requires pyarrow: pip install pyarrow")
+
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.partition_cols = partition_cols
+        self.sort_by = sort_by
+        self.row_group_size = row_group_size
+        self.rows_written = 0
+
+    def __repr__(self):
+        return "ParquetSink: " + self.directory
+
+    def write(self, report_name, report_dataframe):
+        """
+        Appends a chunk to the dataset.
+
+        :param report_name: name of the report the chunk belongs to
+        :param report_dataframe: DataFrame of a single chunk
+        """
+        if report_dataframe.empty:
+            return
+
+        report_dataframe, partition_cols = self._partition(
+            report_name, report_dataframe
+        )
+        pyarrow.parquet.write_to_dataset(
+            pyarrow.Table.from_pandas(report_dataframe, preserve_index=False),
+            root_path=self.directory,
+            partition_cols=partition_cols,
+            basename_template="part-" + uuid.uuid4().hex + "-{i}.parquet",
+        )
+        self.rows_written += len(report_dataframe)
+
+    def merge(self, report_name, report_dataframe, key_columns=None):
+        """
+        Writes a chunk, replacing rows already in the dataset that have the
+        same key_columns values, e.g. revised intervals. Only the partitions
+        the chunk falls in are read and rewritten.
+
+        :param report_name: name of the report the chunk belongs to
+        :param report_dataframe: DataFrame of a single chunk
+        :param key_columns: columns identifying a row, or None for every
+            column except VALUE_COLUMNS, see report_key_columns
+        """
+        if report_dataframe.empty:
+            return
+
+        key_columns = report_key_columns(report_dataframe, key_columns)
+        report_dataframe, partition_cols = self._partition(
+            report_name, report_dataframe
+        )
+        for values, partition in report_dataframe.groupby(
+            partition_cols, observed=True
+        ):
+            if not isinstance(values, tuple):
+                values = (values,)
+            directory = os.path.join(
+                self.directory,
+                *["{}={}".format(x, y) for x, y in zip(partition_cols, values)]
+            )
+            partition = partition.drop(columns=partition_cols)
+            if os.path.isdir(directory):
+                partition = pd.concat(
+                    [pd.read_parquet(directory), partition], ignore_index=True
+                )
+            # a chunk can repeat a key too, so dedupe on the first write as
+            # well; partition values are the same for every row
+            partition = partition.drop_duplicates(
+                subset=[x for x in key_columns if x not in partition_cols],
+                keep="last",
+                ignore_index=True,
+            )
+            if self.sort_by:
+                partition = partition.sort_values(
+                    [x for x in self.sort_by if x in partition.columns],
+                    ignore_index=True,
+                )
+
+            # write the new partition next to the old one, then swap. Hidden
+            # names keep readers of the dataset from picking up either copy.
+            parent, name = os.path.split(directory)
+            temp_directory = os.path.join(parent, "." + name + ".tmp")
+            old_directory = os.path.join(parent, "." + name + ".old")
+            shutil.rmtree(temp_directory, ignore_errors=True)
+            shutil.rmtree(old_directory, ignore_errors=True)
+            os.makedirs(temp_directory)
+            pyarrow.parquet.write_table(
+                pyarrow.Table.from_pandas(partition, preserve_index=False),
+                os.path.join(temp_directory, "part-" + uuid.uuid4().hex + "-0.parquet"),
+                row_group_size=self.row_group_size,
+            )
+            if os.path.isdir(directory):
+                os.replace(directory, old_directory)
+            os.replace(temp_directory, directory)
+            shutil.rmtree(old_directory, ignore_errors=True)
+
+        self.rows_written += len(report_dataframe)
+
+    def _partition(self, report_name, report_dataframe):
+        """
+        Returns report_dataframe with a REPORT column and partition values
+        formatted for directory names, and the columns to partition by.
+        """
+        report_dataframe = report_dataframe.assign(REPORT=report_name)
+        partition_cols = ["REPORT"] + [
+            x for x in self.partition_cols if x in report_dataframe.columns
+        ]
+
+        # typed OPR_DATE partitions are named by date, as untyped ones are
+        for column in partition_cols:
+            if pd.api.types.is_datetime64_any_dtype(report_dataframe[column]):
+                report_dataframe[column] = report_dataframe[column].dt.strftime(
+                    "%Y-%m-%d"
+                )
+
+        return report_dataframe, partition_cols
+
+    def close(self):
+        """
+        Returns the dataset directory.
+        """
+        return self.directory
+
+
+class MemorySink:
+    """
+    Output sink for pyoasis.repeat_calls.fetch_report that keeps each chunk
+    in memory, e.g. to collect the chunks of several fetch_report calls into
+    a single DataFrame.
+    """
+
+    def __init__(self):
+        self.report_dataframes = []
+
+    def __repr__(self):
+        return "MemorySink: {} chunks".format(len(self.report_dataframes))
+
+    def write(self, report_name, report_dataframe):
+        """
+        Keeps a chunk.
+
+        :param report_name: name of the report the chunk belongs to
+        :param report_dataframe: DataFrame of a single chunk
+        """
+        if not report_dataframe.empty:
+            self.report_dataframes.append(report_dataframe)
+
+    def close(self):
+        """
+        Returns all chunks kept so far as a single DataFrame.
+        """
+        if not self.report_dataframes:
+            return pd.DataFrame()
+
+        return pd.concat(self.report_dataframes)
+
+
+def peak_period(local_times):
+    """
+    Labels local interval start times "ON_PEAK" from hour ending 7 through
+    hour ending 22, Monday through Saturday, and "OFF_PEAK" otherwise, for
+    AggregateSink(period=peak_period). Holidays are not taken into account.
+
+    :param local_times: Series of naive local datetimes
+    :return: Series of strings
+    """
+    on_peak = (local_times.dt.dayofweek < 6) & local_times.dt.hour.between(6, 21)
+
+    return on_peak.map({True: "ON_PEAK", False: "OFF_PEAK"})
+
+
+class AggregateSink:
+    """
+    Output sink for pyoasis.repeat_calls.fetch_report that folds each chunk
+    into running group-by accumulators instead of keeping its rows, e.g. for
+    hourly averages per node and DATA_ITEM of RTM ALL_APNODES reports:
+
+        fetch_report(..., sink=AggregateSink("1H"))
+
+    Intervals are resampled into buckets of freq: buckets shorter than a day
+    start on whole multiples of freq in UTC, daily and longer buckets start
+    at local midnight in timezone_. Per bucket and group, the sum, count,
+    minimum, maximum and last value are kept, and the mean is derived from
+    them.
+
+    Chunks from fetch_report arrive in time order, so buckets before the
+    first bucket of a chunk are final. With a downstream sink, final buckets
+    are written to it as soon as they are complete and memory only holds the
+    buckets still open, so a year of data is summarized in bounded memory.
+    """
+
+    def __init__(
+        self,
+        freq="1H",
+        by=["RESOURCE_NAME", "DATA_ITEM"],
+        value_column="VALUE",
+        time_column="INTERVAL_START_GMT",
+        timezone_=timezone("US/Pacific"),
+        period=None,
+        sink=None,
+    ):
+        """
+        :param freq: bucket length, a fixed pandas frequency, e.g. "1H",
+            "15min" or "1D"
+        :param by: columns to group by within each bucket; columns a report
+            lacks are skipped
+        :param value_column: column of the values aggregated
+        :param time_column: column of the interval start timestamps
+        :param timezone_: pytz.timezone of daily buckets and of OPR_DATE
+        :param period: function labeling naive local interval start times,
+            e.g. peak_period, to aggregate each label separately in a PERIOD
+            column, or None
+        :param sink: output sink such as ParquetSink or
+            pyoasis.store.ReportStore that final buckets are written to, or
+            None to keep them in memory until close
+        """
+        self.freq = pd.tseries.frequencies.to_offset(freq)
+        self.by = by
+        self.value_column = value_column
+        self.time_column = time_column
+        self.timezone_ = timezone_
+        self.period = period
+        self.sink = sink
+        self.rows_written = 0
+
+        # report name -> accumulators of open buckets, and of final buckets
+        # when there is no downstream sink
+        self.accumulators = {}
+        self.final = {}
+
+    def __repr__(self):
+        return "AggregateSink: {} buckets".format(self.freq.freqstr)
+
+    def write(self, report_name, report_dataframe):
+        """
+        Folds a chunk into the accumulators of report_name.
+
+        :param report_name: name of the report the chunk belongs to
+        :param report_dataframe: DataFrame of a single chunk
+        """
+        if report_dataframe.empty:
+            return
+
+        times = pd.to_datetime(report_dataframe[self.time_column], utc=True)
+        buckets = self._buckets(times)
+        accumulators = self._accumulate(report_dataframe, times, buckets)
+        if report_name in self.accumulators:
+            accumulators = self._combine(
+                pd.concat([self.accumulators[report_name], accumulators])
+            )
+        self.rows_written += len(report_dataframe)
+
+        # buckets before the chunk's first bucket receive no more rows
+        is_final = accumulators["BUCKET"] < buckets.min()
+        self.accumulators[report_name] = accumulators[~is_final]
+        if is_final.any():
+            self._finish(report_name, accumulators[is_final])
+
+    def close(self):
+        """
+        Finishes all open buckets. Returns the result of sink.close() with a
+        downstream sink, otherwise a DataFrame of the group columns, PERIOD,
+        INTERVAL_START_GMT of each bucket, its local OPR_DATE and a column
+        per statistic, e.g. VALUE_MEAN.
+        """
+        for report_name, accumulators in self.accumulators.items():
+            self._finish(report_name, accumulators)
+        self.accumulators = {}
+
+        if self.sink:
+            return self.sink.close()
+
+        if not self.final:
+            return pd.DataFrame()
+
+        aggregates = {x: pd.concat(y, ignore_index=True) for x, y in self.final.items()}
+        if len(aggregates) == 1:
+            return next(iter(aggregates.values()))
+
+        # several reports are told apart by a REPORT column
+        return pd.concat(
+            [y.assign(REPORT=x) for x, y in aggregates.items()], ignore_index=True
+        )
+
+    def _buckets(self, times):
+        """
+        Returns the UTC start of the bucket of each UTC interval start time.
+        """
+        if self.freq.nanos < pd.Timedelta(days=1).value:
+            return times.dt.floor(self.freq)
+
+        local_times = times.dt.tz_convert(self.timezone_).dt.tz_localize(None)
+
+        return (
+            local_times.dt.floor(self.freq)
+            .dt.tz_localize(self.timezone_)
+            .dt.tz_convert("UTC")
+        )
+
+    def _accumulate(self, report_dataframe, times, buckets):
+        """
+        Returns the accumulators of a single chunk, one row per group.
+        """
+        frame = pd.DataFrame(
+            {
+                x: report_dataframe[x].astype(object)
+                for x in self.by
+                if x in report_dataframe.columns
+            }
+        )
+        frame["BUCKET"] = buckets
+        frame["TIME"] = times
+        frame["VALUE"] = pd.to_numeric(
+            report_dataframe[self.value_column], errors="coerce"
+        )
+        if self.period:
+            frame["PERIOD"] = self.period(
+                frame["TIME"].dt.tz_convert(self.timezone_).dt.tz_localize(None)
+            ).to_numpy()
+
+        grouped = frame.sort_values("TIME", kind="stable").groupby(
+            self._group_columns(frame), sort=False, dropna=False
+        )
+        accumulators = grouped["VALUE"].agg(["sum", "count", "min", "max", "last"])
+        accumulators.columns = ACCUMULATORS
+        accumulators["LAST_TIME"] = grouped["TIME"].max()
+
+        return accumulators.reset_index()
+
+    def _combine(self, accumulators):
+        """
+        Merges accumulators of the same group, keeping the latest LAST.
+        """
+        combined = (
+            accumulators.sort_values("LAST_TIME", kind="stable")
+            .groupby(self._group_columns(accumulators), sort=False, dropna=False)
+            .agg(
+                SUM=("SUM", "sum"),
+                COUNT=("COUNT", "sum"),
+                MIN=("MIN", "min"),
+                MAX=("MAX", "max"),
+                LAST=("LAST", "last"),
+                LAST_TIME=("LAST_TIME", "last"),
+            )
+        )
+
+        return combined.reset_index()
+
+    def _group_columns(self, frame):
+        """
+        Returns the columns of frame accumulators are grouped by.
+        """
+        return [x for x in self.by + ["PERIOD", "BUCKET"] if x in frame.columns]
+
+    def _finish(self, report_name, accumulators):
+        """
+        Converts final accumulators to aggregates and writes them to the
+        downstream sink, or keeps them.
+        """
+        if accumulators.empty:
+            return
+
+        aggregates = accumulators.drop(columns="LAST_TIME").rename(
+            columns={"BUCKET": "INTERVAL_START_GMT"}
+        )
+        aggregates.insert(
+            aggregates.columns.get_loc("INTERVAL_START_GMT") + 1,
+            "OPR_DATE",
+            aggregates["INTERVAL_START_GMT"]
+            .dt.tz_convert(self.timezone_)
+            .dt.tz_localize(None)
+            .dt.normalize(),
+        )
+        aggregates.insert(
+            aggregates.columns.get_loc("SUM"),
+            "MEAN",
+            aggregates["SUM"] / aggregates["COUNT"].where(aggregates["COUNT"] > 0),
+        )
+        aggregates = aggregates.rename(
+            columns={x: "{}_{}".format(self.value_column, x) for x in STATISTICS}
+        ).sort_values(
+            ["INTERVAL_START_GMT"] + [x for x in self.by if x in aggregates.columns],
+            ignore_index=True,
+        )
+
+        if self.sink:
+            self.sink.write(report_name, aggregates)
+        else:
+            self.final.setdefault(report_name, []).append(aggregates)
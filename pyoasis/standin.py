@@ -0,0 +1,487 @@
+"""
+Local stand-in for the OASIS API, serving synthetic reports with
+configurable faults for load-testing the fetch pipeline, e.g.:
+
+    python -m pyoasis.standin --drop-rate 0.1 --rate-limit 5 --days 7
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import pandas as pd
+import random
+import socket
+import struct
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+from zipfile import ZipFile
+
+from pyoasis.catalog import get_endpoint_catalog
+from pyoasis.client import OASISClient
+from pyoasis.repeat_calls import chunk_windows, fetch_report
+from pyoasis.synthetic import (
+    LMP_DATA_ITEMS,
+    synthetic_error_xml,
+    synthetic_xml_name,
+    synthetic_zip_bytes,
+)
+
+# querystring datetime format of OASIS
+QUERY_DATETIME_FORMAT = "%Y%m%dT%H:%M%z"
+
+# ERROR of INVALID_REQUEST.xml answers
+INVALID_REQUEST_ERROR = ("1001", "Invalid request")
+
+# body of non-zip answers, as served by OASIS during maintenance
+NON_ZIP_BODY = b"<html><body>OASIS is temporarily unavailable</body></html>"
+
+FAULTS = ["rate_limited", "dropped", "reset", "corrupt", "non_zip", "invalid_request"]
+
+
+def invalid_request_zip_bytes(err_code=INVALID_REQUEST_ERROR[0]):
+    """
+    Returns the content of a zip file holding INVALID_REQUEST.xml, as OASIS
+    answers requests it cannot serve.
+    """
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w") as zipfile:
+        zipfile.writestr(
+            "INVALID_REQUEST.xml",
+            synthetic_error_xml(err_code, INVALID_REQUEST_ERROR[1]),
+        )
+
+    return buffer.getvalue()
+
+
+class OASISStandIn:
+    """
+    HTTP server answering /oasisapi/SingleZip and /oasisapi/GroupZip
+    requests like OASIS. Report names and query params are checked against
+    the EndpointCatalog, and each valid request is answered with a synthetic
+    report covering the requested window, one interval per hour. Faults are
+    injected at random with the configured rates:
+
+        - rate_limited: 429 with a Retry-After header when requests arrive
+          faster than rate_limit per second
+        - dropped: the connection is closed without an answer
+        - reset: the headers and half of the body are sent, then the
+          connection is reset
+        - corrupt: a truncated zip file
+        - non_zip: a 200 answer with an HTML body
+        - invalid_request: a zip file holding INVALID_REQUEST.xml
+
+    latency and bandwidth slow down every answer. Counts of requests, faults
+    and bytes served are kept in self.stats.
+    """
+
+    def __init__(
+        self,
+        host="localhost",
+        port=0,
+        nodes=10,
+        data_items=LMP_DATA_ITEMS,
+        latency=0,
+        bandwidth=None,
+        rate_limit=None,
+        retry_after=1,
+        drop_rate=0,
+        reset_rate=0,
+        corrupt_rate=0,
+        non_zip_rate=0,
+        invalid_request_rate=0,
+        seed=0,
+    ):
+        """
+        :param host: host to listen on (string)
+        :param port: port to listen on, or 0 for any free port (int)
+        :param nodes: number of nodes per synthetic report, unless a node
+            parameter names the nodes (int)
+        :param data_items: list of DATA_ITEMs per node
+        :param latency: seconds before each answer starts (float)
+        :param bandwidth: bytes per second answers are sent at, or None for
+            no limit (int)
+        :param rate_limit: requests per second served before answering 429,
+            or None for no limit (float)
+        :param retry_after: Retry-After seconds of 429 answers (int)
+        :param drop_rate: share of requests whose connection is dropped
+        :param reset_rate: share of requests whose connection is reset while
+            the body is sent
+        :param corrupt_rate: share of requests answered with a corrupt zip
+        :param non_zip_rate: share of requests answered with an HTML body
+        :param invalid_request_rate: share of valid requests answered with
+            INVALID_REQUEST.xml
+        :param seed: seed of the fault injection (int)
+        """
+        self.nodes = nodes
+        self.data_items = data_items
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.fault_rates = {
+            "dropped": drop_rate,
+            "reset": reset_rate,
+            "corrupt": corrupt_rate,
+            "non_zip": non_zip_rate,
+            "invalid_request": invalid_request_rate,
+        }
+
+        self.catalog = get_endpoint_catalog()
+        self.random = random.Random(seed)
+        self.stats = self._empty_stats()
+        self._lock = threading.Lock()
+        self._last_request = None
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def __repr__(self):
+        return "OASISStandIn: " + self.base_url
+
+    @property
+    def base_url(self):
+        """
+        Scheme and host to pass as base_url, e.g. to OASISClient.
+        """
+        host, port = self.server.server_address[:2]
+
+        return "http://{}:{}".format(host, port)
+
+    def start(self):
+        """
+        Serves requests on a background thread.
+
+        :return: self
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        """
+        Stops serving and closes the socket.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_stats(self):
+        """
+        Resets self.stats and returns the previous counts.
+        """
+        with self._lock:
+            stats, self.stats = self.stats, self._empty_stats()
+
+        return stats
+
+    def handle(self, handler):
+        """
+        Answers a single request.
+
+        :param handler: BaseHTTPRequestHandler of the request
+        """
+        fault = self._draw_fault()
+        self._count("requests")
+        if fault:
+            self._count(fault)
+
+        if fault == "rate_limited":
+            handler.send_response(429)
+            handler.send_header("Retry-After", str(self.retry_after))
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        if fault == "dropped":
+            handler.close_connection = True
+            handler.connection.close()
+            return
+
+        if fault == "non_zip":
+            body = NON_ZIP_BODY
+        elif fault == "invalid_request":
+            body = invalid_request_zip_bytes()
+        else:
+            body = self.answer(handler.path)
+            if fault == "corrupt":
+                body = body[: len(body) // 2]
+
+        if self.latency:
+            time.sleep(self.latency)
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-zip-compressed")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        if fault == "reset":
+            self._send(handler, body[: len(body) // 2])
+            self._count("bytes", len(body) // 2)
+            self._reset(handler)
+            return
+        self._send(handler, body)
+        self._count("bytes", len(body))
+
+    def answer(self, path):
+        """
+        Returns the zip file content answering a request path: a synthetic
+        report of the requested window, or INVALID_REQUEST.xml when the
+        report, endpoint or query params are not valid.
+
+        :param path: request path with querystring (string)
+        :return: bytes
+        """
+        url = urlsplit(path)
+        query_params = {x: y[0] for x, y in parse_qs(url.query).items()}
+        report_name = query_params.pop("queryname", None) or query_params.pop(
+            "groupid", None
+        )
+
+        try:
+            endpoint = self.catalog.endpoint(report_name)
+            if endpoint.path != url.path:
+                raise ValueError("{} is not served at {}".format(report_name, path))
+            self.catalog.validate(report_name, query_params)
+            start = datetime.strptime(
+                query_params["startdatetime"], QUERY_DATETIME_FORMAT
+            )
+            # group zips are requested by trade date, without an end
+            end = start + timedelta(days=1)
+            if "enddatetime" in query_params:
+                end = datetime.strptime(
+                    query_params["enddatetime"], QUERY_DATETIME_FORMAT
+                )
+        except (KeyError, ValueError):
+            self._count("invalid")
+            return invalid_request_zip_bytes()
+
+        intervals = int((end - start) / timedelta(hours=1))
+        if intervals < 1:
+            self._count("invalid")
+            return invalid_request_zip_bytes()
+
+        # node queries are answered for the comma-separated nodes only
+        nodes = self.nodes
+        if query_params.get("node"):
+            nodes = query_params["node"].split(",")
+
+        market_run_id = query_params.get("market_run_id", "DAM")
+        return synthetic_zip_bytes(
+            xml_name=synthetic_xml_name(report_name, start, end, market_run_id),
+            report_name=report_name,
+            nodes=nodes,
+            intervals=intervals,
+            data_items=self.data_items,
+            start=start,
+            market_run_id=market_run_id,
+        )
+
+    def _draw_fault(self):
+        """
+        Returns the fault to inject into the next answer, or None.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.rate_limit and self._last_request is not None:
+                if now - self._last_request < 1 / self.rate_limit:
+                    return "rate_limited"
+            self._last_request = now
+
+            draw = self.random.random()
+            for fault, rate in self.fault_rates.items():
+                if draw < rate:
+                    return fault
+                draw -= rate
+
+        return None
+
+    def _send(self, handler, body, block_size=64 * 1024):
+        """
+        Writes body, at self.bandwidth bytes per second if set.
+        """
+        if not self.bandwidth:
+            handler.wfile.write(body)
+            return
+
+        for i in range(0, len(body), block_size):
+            block = body[i : i + block_size]
+            handler.wfile.write(block)
+            time.sleep(len(block) / self.bandwidth)
+
+    @staticmethod
+    def _reset(handler):
+        """
+        Resets the connection of handler: closing with a zero linger time
+        sends a TCP RST instead of a FIN.
+        """
+        handler.wfile.flush()
+        handler.connection.setsockopt(
+            socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+        )
+        handler.close_connection = True
+        handler.connection.close()
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    @staticmethod
+    def _empty_stats():
+        return dict({"requests": 0, "invalid": 0, "bytes": 0}, **{x: 0 for x in FAULTS})
+
+
+def load_test(
+    stand_in,
+    report_name="PRC_LMP",
+    start=datetime(2020, 6, 1),
+    end_limit=datetime(2020, 6, 8),
+    query_params={"market_run_id": "DAM", "version": 1},
+    client=None,
+    destination_directory="caiso_downloads",
+    **fetch_arguments
+):
+    """
+    Runs fetch_report against a stand-in and measures end-to-end throughput
+    and retries.
+
+    :param stand_in: running OASISStandIn
+    :param report_name: see pyoasis.utils.get_report_names()
+    :param start: datetime
+    :param end_limit: datetime
+    :param query_params: see pyoasis.utils.get_report_params()
+    :param client: pyoasis.client.OASISClient, defaults to a client of the
+        stand-in with short backoff delays and no request spacing
+    :param destination_directory: directory to write the CSV to
+    :param fetch_arguments: keyword arguments of fetch_report, e.g.
+        chunk_size or max_workers
+    :return: dictionary of seconds, rows, expected_rows, rows_per_second,
+        bytes_per_second, retries, error_responses, error (or None) and the
+        stand-in stats. error is also set when fewer rows than the stand-in
+        served arrive, so a run that lost data is never reported as passed.
+    """
+    client = client or OASISClient(
+        stand_in.base_url, backoff_factor=0.01, max_backoff=2, request_interval=0
+    )
+    windows = len(
+        list(
+            chunk_windows(
+                start, end_limit, fetch_arguments.get("chunk_size", timedelta(days=1))
+            )
+        )
+    )
+    # the stand-in serves one row per node, DATA_ITEM and hour
+    nodes = query_params.get("node")
+    expected_rows = (
+        (len(nodes.split(",")) if nodes else stand_in.nodes)
+        * len(stand_in.data_items)
+        * int((end_limit - start) / timedelta(hours=1))
+    )
+
+    stand_in.reset_stats()
+    error = None
+    rows = 0
+    started = time.perf_counter()
+    try:
+        csv_path = fetch_report(
+            report_name,
+            start,
+            end_limit,
+            query_params,
+            client=client,
+            destination_directory=destination_directory,
+            **fetch_arguments
+        )
+        rows = len(pd.read_csv(csv_path))
+        if rows != expected_rows:
+            error = "expected {} rows, got {}".format(expected_rows, rows)
+    except Exception as e:
+        error = repr(e)
+    seconds = time.perf_counter() - started
+    stats = stand_in.reset_stats()
+
+    return {
+        "seconds": seconds,
+        "rows": rows,
+        "expected_rows": expected_rows,
+        "rows_per_second": rows / seconds,
+        "bytes_per_second": stats["bytes"] / seconds,
+        "retries": max(stats["requests"] - windows, 0),
+        "error_responses": stats["invalid"] + stats["invalid_request"],
+        "error": error,
+        "stats": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--serve", action="store_true", help="only serve requests")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--nodes", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--bandwidth", type=int, help="bytes per second")
+    parser.add_argument("--rate-limit", type=float, help="requests per second")
+    parser.add_argument("--drop-rate", type=float, default=0)
+    parser.add_argument("--reset-rate", type=float, default=0)
+    parser.add_argument("--corrupt-rate", type=float, default=0)
+    parser.add_argument("--non-zip-rate", type=float, default=0)
+    parser.add_argument("--invalid-request-rate", type=float, default=0)
+    parser.add_argument("--days", type=int, default=7, help="days to fetch")
+    parser.add_argument("--chunk-hours", type=int, default=24)
+    parser.add_argument("--max-workers", type=int, default=1)
+    parser.add_argument("--destination-directory", default="caiso_downloads")
+    arguments = parser.parse_args()
+
+    stand_in = OASISStandIn(
+        host=arguments.host,
+        port=arguments.port,
+        nodes=arguments.nodes,
+        latency=arguments.latency,
+        bandwidth=arguments.bandwidth,
+        rate_limit=arguments.rate_limit,
+        drop_rate=arguments.drop_rate,
+        reset_rate=arguments.reset_rate,
+        corrupt_rate=arguments.corrupt_rate,
+        non_zip_rate=arguments.non_zip_rate,
+        invalid_request_rate=arguments.invalid_request_rate,
+    )
+
+    if arguments.serve:
+        print("serving OASIS stand-in at", stand_in.base_url)
+        try:
+            stand_in.server.serve_forever()
+        except KeyboardInterrupt:
+            stand_in.server.server_close()
+        return
+
+    start = datetime(2020, 6, 1)
+    with stand_in:
+        results = load_test(
+            stand_in,
+            start=start,
+            end_limit=start + timedelta(days=arguments.days),
+            chunk_size=timedelta(hours=arguments.chunk_hours),
+            max_workers=arguments.max_workers,
+            destination_directory=arguments.destination_directory,
+        )
+    for key, value in results.items():
+        print("{}: {}".format(key, value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+from datetime import timedelta
+import os
+import pandas as pd
+
+from pyoasis.sinks import ParquetSink
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+    import pyarrow.fs
+except ImportError:
+    pyarrow = None
+
+# rows per row group; smaller groups let node and time filters skip more data
+ROW_GROUP_SIZE = 16384
+
+
+class ReportStore(ParquetSink):
+    """
+    Local time-series store of fetched reports, laid out as a Parquet dataset
+    partitioned by report and operating date, like ParquetSink:
+
+        directory/REPORT=<report_name>/OPR_DATE=<yyyy-mm-dd>/part-*.parquet
+
+    Every write is merged into its partitions, replacing rows with the same
+    key, so overlapping or re-fetched chunks are not duplicated. Each
+    partition is sorted by node and interval start and written in small row
+    groups, so read can skip partitions by date and row groups by node and
+    time using the Parquet statistics. Files are memory-mapped when read.
+
+    A ReportStore can be passed as the sink of fetch_report or sync_report.
+    """
+
+    def __init__(
+        self,
+        directory,
+        key_columns=None,
+        node_column="RESOURCE_NAME",
+        start_column="INTERVAL_START_GMT",
+        end_column="INTERVAL_END_GMT",
+        row_group_size=ROW_GROUP_SIZE,
+    ):
+        """
+        :param directory: root directory of the store (string)
+        :param key_columns: columns identifying a row of every report, or
+            None for every column of a report except its values, see
+            pyoasis.sinks.report_key_columns
+        :param node_column: column name of nodes
+        :param start_column: column name of start timestamps
+        :param end_column: column name of end timestamps
+        :param row_group_size: maximum rows per row group
+        """
+        super().__init__(
+            directory,
+            partition_cols=["OPR_DATE"],
+            sort_by=[node_column, start_column],
+            row_group_size=row_group_size,
+        )
+        self.key_columns = key_columns
+        self.node_column = node_column
+        self.start_column = start_column
+        self.end_column = end_column
+
+    def __repr__(self):
+        return "ReportStore: " + self.directory
+
+    def write(self, report_name, report_dataframe):
+        """
+        Merges a chunk, e.g. OASISReport.report_dataframe, into the store.
+
+        :param report_name: name of the report the chunk belongs to
+        :param report_dataframe: DataFrame
+        """
+        if report_dataframe.empty:
+            return
+
+        # timestamps are stored typed so that time ranges can use statistics
+        report_dataframe = report_dataframe.copy()
+        for column in [self.start_column, self.end_column]:
+            if column in report_dataframe.columns:
+                report_dataframe[column] = pd.to_datetime(
+                    report_dataframe[column], utc=True
+                )
+
+        self.merge(report_name, report_dataframe, self.key_columns)
+
+    def report_names(self):
+        """
+        Returns the names of the reports in the store.
+
+        :return: sorted list of strings
+        """
+        if not os.path.isdir(self.directory):
+            return []
+
+        return sorted(
+            x[len("REPORT=") :]
+            for x in os.listdir(self.directory)
+            if x.startswith("REPORT=")
+        )
+
+    def read(self, report_name, nodes=None, start=None, end=None, columns=None):
+        """
+        Reads the rows of a report for the given nodes and intervals. Only
+        the partitions and row groups that can hold matching rows are loaded.
+
+        :param report_name: name of a report in the store
+        :param nodes: list of nodes, or None for all
+        :param start: timezone-aware datetime; intervals starting at or after
+            start are read, or None for no bound
+        :param end: timezone-aware datetime; intervals ending at or before
+            end are read, or None for no bound
+        :param columns: list of columns to read, or None for all
+        :return: DataFrame sorted by interval start and node
+        """
+        directory = os.path.join(self.directory, "REPORT=" + report_name)
+        if not os.path.isdir(directory):
+            raise ValueError("no {} data in {}".format(report_name, self))
+
+        dataset = pyarrow.dataset.dataset(
+            directory,
+            format="parquet",
+            partitioning=pyarrow.dataset.partitioning(
+                pyarrow.schema([("OPR_DATE", pyarrow.string())]), flavor="hive"
+            ),
+            filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True),
+        )
+        names = dataset.schema.names
+
+        expressions = []
+        if nodes is not None:
+            expressions.append(pyarrow.dataset.field(self.node_column).isin(nodes))
+        if start is not None:
+            start = pd.Timestamp(start).tz_convert("UTC")
+            expressions.append(pyarrow.dataset.field(self.start_column) >= start)
+            # operating dates are local, so allow a day either side of UTC
+            if "OPR_DATE" in names:
+                expressions.append(
+                    pyarrow.dataset.field("OPR_DATE")
+                    >= (start - timedelta(days=1)).strftime("%Y-%m-%d")
+                )
+        if end is not None:
+            end = pd.Timestamp(end).tz_convert("UTC")
+            expressions.append(pyarrow.dataset.field(self.end_column) <= end)
+            if "OPR_DATE" in names:
+                expressions.append(
+                    pyarrow.dataset.field("OPR_DATE")
+                    <= (end + timedelta(days=1)).strftime("%Y-%m-%d")
+                )
+
+        expression = None
+        for x in expressions:
+            expression = x if expression is None else expression & x
+
+        report_dataframe = dataset.to_table(
+            columns=columns, filter=expression
+        ).to_pandas()
+
+        sort_by = [
+            x
+            for x in [self.start_column, self.node_column]
+            if x in report_dataframe.columns
+        ]
+        if sort_by:
+            report_dataframe = report_dataframe.sort_values(sort_by, ignore_index=True)
+
+        return report_dataframe
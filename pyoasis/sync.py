@@ -0,0 +1,314 @@
+from datetime import datetime, time, timedelta
+import json
+import os
+import pandas as pd
+from pytz import timezone
+
+from pyoasis.repeat_calls import (
+    chunk_windows,
+    fetch_chunk,
+    trim_report_dataframe,
+    with_required_columns,
+)
+
+# OASIS Publication and Revisions Log
+PUBLICATION_LOG_REPORT = "ATL_PUB"
+
+
+class SyncState:
+    """
+    High-water marks of incremental syncs, stored as JSON. For each report
+    and query params, the state holds the end of the latest interval synced
+    and when the publication log was last checked.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: JSON file, created on the first update (string)
+        """
+        self.path = os.path.abspath(os.path.expanduser(path))
+
+        self.syncs = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.syncs = json.load(f)
+
+    def __repr__(self):
+        return "SyncState: " + self.path
+
+    @staticmethod
+    def key(report_name, query_params):
+        """
+        Returns the key a sync is stored under, e.g.
+        "PRC_LMP?market_run_id=DAM&node=TH_NP15_GEN-APND".
+        """
+        return (
+            report_name
+            + "?"
+            + "&".join("{}={}".format(x, y) for x, y in sorted(query_params.items()))
+        )
+
+    def get(self, report_name, query_params):
+        """
+        Returns the state of a sync.
+
+        :param report_name: (string)
+        :param query_params: querystring parameters (dictionary)
+        :return: dictionary of "high_water_mark" and "checked_at" datetimes,
+            empty before the first sync
+        """
+        sync = self.syncs.get(self.key(report_name, query_params), {})
+
+        return {x: datetime.fromisoformat(y) for x, y in sync.items() if y}
+
+    def update(self, report_name, query_params, **values):
+        """
+        Updates the state of a sync and saves it.
+
+        :param report_name: (string)
+        :param query_params: querystring parameters (dictionary)
+        :param values: "high_water_mark" and/or "checked_at" datetimes
+        """
+        sync = self.syncs.setdefault(self.key(report_name, query_params), {})
+        sync.update({x: y.isoformat() for x, y in values.items()})
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.syncs, f, indent=2, sort_keys=True)
+        os.replace(self.path + ".tmp", self.path)
+
+
+class PublicationLog:
+    """
+    Reads the OASIS Publication and Revisions Log (ATL_PUB) to find the trade
+    dates of a report that were published or revised after a point in time.
+    The column names default to those of ATL_PUB and can be overridden.
+    """
+
+    def __init__(
+        self,
+        query_params={
+            "atlpubversion": "ALL",
+            "oasis_section": "ALL",
+            "status": "ALL",
+            "version": 1,
+        },
+        report_column="REPORT_NAME",
+        date_column="OPR_DATE",
+        published_column="PUBLICATION_TIME",
+    ):
+        """
+        :param query_params: ATL_PUB querystring parameters (dictionary)
+        :param report_column: column with the name of the published report
+        :param date_column: column with the published trade date
+        :param published_column: column with the time of publication
+        """
+        self.query_params = query_params
+        self.report_column = report_column
+        self.date_column = date_column
+        self.published_column = published_column
+
+    def __repr__(self):
+        return "PublicationLog: " + PUBLICATION_LOG_REPORT
+
+    def revised_dates(
+        self,
+        report_name,
+        start,
+        end,
+        published_after,
+        market_run_id=None,
+        **fetch_arguments
+    ):
+        """
+        Returns the trade dates between start and end of a report published
+        or revised after published_after.
+
+        :param report_name: see pyoasis.utils.get_report_names()
+        :param start: datetime
+        :param end: datetime
+        :param published_after: timezone-aware datetime
+        :param market_run_id: market of the report, if any
+        :param fetch_arguments: keyword arguments of fetch_chunk, e.g.
+            client and max_attempts
+        :return: sorted list of dates
+        """
+        query_params = dict(self.query_params)
+        if market_run_id:
+            query_params["market_run_id"] = market_run_id
+
+        report_dataframes = fetch_chunk(
+            report_name=PUBLICATION_LOG_REPORT,
+            chunk_start=start,
+            chunk_end=end,
+            query_params=query_params,
+            filters={self.report_column: report_name},
+            **fetch_arguments
+        )
+        if not report_dataframes:
+            return []
+
+        publication_log = pd.concat(report_dataframes)
+        published = pd.to_datetime(publication_log[self.published_column], utc=True)
+        publication_log = publication_log[published > published_after]
+
+        return sorted(set(pd.to_datetime(publication_log[self.date_column]).dt.date))
+
+
+def sync_report(
+    report_name,
+    query_params,
+    sink,
+    state,
+    start=None,
+    end_limit=None,
+    chunk_size=timedelta(days=1),
+    revision_window=timedelta(days=7),
+    publication_log=PublicationLog(),
+    key_columns=None,
+    timezone_=timezone("US/Pacific"),
+    start_column="INTERVAL_START_GMT",
+    end_column="INTERVAL_END_GMT",
+    max_attempts=10,
+    parser="xmltodict",
+    typed=False,
+    filters=None,
+    columns=None,
+    client=None,
+    cache=None,
+):
+    """
+    Brings a local copy of a report up to date, fetching only what is new
+    since the last sync:
+
+        - intervals after the high-water mark (start on the first sync)
+          through end_limit, in chunk_size windows
+        - trade dates within revision_window before the high-water mark that
+          the publication log lists as published or revised since the last
+          sync
+
+    Each chunk is merged into sink with sink.merge, replacing rows with the
+    same key_columns, and the high-water mark is saved after every chunk, so
+    an interrupted sync continues where it stopped.
+
+    :param report_name: see pyoasis.utils.get_report_names()
+    :param query_params: see pyoasis.utils.get_report_params()
+    :param sink: sink with a merge method, e.g. pyoasis.sinks.ParquetSink
+    :param state: SyncState
+    :param start: datetime to sync from on the first sync
+    :param end_limit: datetime to sync through, defaults to now
+    :param chunk_size: length of report to request (timedelta)
+    :param revision_window: how far before the high-water mark revisions
+        are looked for (timedelta)
+    :param publication_log: PublicationLog, or None to skip revisions
+    :param key_columns: columns identifying a row of the report, or None
+        for every column except its values, see
+        pyoasis.sinks.report_key_columns
+    :param timezone_: pytz.timezone object used for naive datetime objects
+        and trade dates
+    :param start_column: column name of start timestamps
+    :param end_column: column name of end timestamps
+    :param max_attempts: number of back-off attempts (int)
+    :param parser: OASISReport parser ("xmltodict" or "iterparse")
+    :param typed: True to parse columns to the report's typed schema
+    :param filters: row filters applied while parsing, see OASISReport
+    :param columns: list of DATA columns to keep, or None for all
+    :param client: pyoasis.client.OASISClient used to make the requests
+    :param cache: pyoasis.cache.ChunkCache of report downloads; the
+        publication log is never cached. Windows after the high-water mark
+        and revised trade dates are always downloaded again, since a cached
+        copy predates the data being synced, and replace their cached copy.
+    :return: dictionary of the new "high_water_mark", the "windows" fetched
+        and the "revised_dates" fetched again
+    """
+    checked_at = datetime.now(timezone_)
+
+    # localize naive datetime
+    end_limit = end_limit or checked_at
+    if not end_limit.tzinfo:
+        end_limit = timezone_.localize(end_limit)
+    if start and not start.tzinfo:
+        start = timezone_.localize(start)
+
+    sync = state.get(report_name, query_params)
+    high_water_mark = sync.get("high_water_mark", start)
+    if high_water_mark is None:
+        raise ValueError("start is required for the first sync of a report")
+
+    fetch_arguments = dict(
+        max_attempts=max_attempts,
+        parser=parser,
+        typed=typed,
+        filters=filters,
+        columns=with_required_columns(
+            columns, (key_columns or []) + [start_column, end_column]
+        ),
+        client=client,
+    )
+
+    def merge_window(window, refresh=False):
+        """
+        Fetches a window, merges it into sink and returns the end of its
+        latest interval, or None if it has no data. With refresh, a cached
+        copy of the window is downloaded again and replaced.
+        """
+        report_dataframes = fetch_chunk(
+            report_name=report_name,
+            chunk_start=window[0],
+            chunk_end=window[1],
+            query_params=query_params,
+            cache=cache,
+            refresh=refresh,
+            **fetch_arguments
+        )
+        if not report_dataframes:
+            return None
+
+        report_dataframe = trim_report_dataframe(
+            pd.concat(report_dataframes), *window, start_column, end_column
+        )
+        if report_dataframe.empty:
+            return None
+        sink.merge(report_name, report_dataframe, key_columns)
+
+        return report_dataframe[end_column].max().to_pydatetime()
+
+    # trade dates revised since the last sync
+    revised_dates = []
+    if publication_log and sync.get("checked_at"):
+        revised_dates = publication_log.revised_dates(
+            report_name,
+            high_water_mark - revision_window,
+            high_water_mark,
+            sync["checked_at"],
+            market_run_id=query_params.get("market_run_id"),
+            max_attempts=max_attempts,
+            parser=parser,
+            client=client,
+        )
+    for date in revised_dates:
+        day_start = timezone_.localize(datetime.combine(date, time()))
+        merge_window((day_start, day_start + timedelta(days=1)), refresh=True)
+
+    # intervals after the high-water mark
+    windows = []
+    for window in chunk_windows(high_water_mark, end_limit, chunk_size):
+        window = (window[0], min(window[1], end_limit))
+        data_end = merge_window(window, refresh=True)
+        windows.append(window)
+        if data_end and data_end > high_water_mark:
+            high_water_mark = data_end
+            state.update(report_name, query_params, high_water_mark=high_water_mark)
+
+    state.update(
+        report_name,
+        query_params,
+        high_water_mark=high_water_mark,
+        checked_at=checked_at,
+    )
+
+    return {
+        "high_water_mark": high_water_mark,
+        "windows": windows,
+        "revised_dates": revised_dates,
+    }
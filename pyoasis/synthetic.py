@@ -0,0 +1,246 @@
+from datetime import datetime, timedelta
+import io
+import numpy as np
+from pytz import timezone, utc
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from pyoasis.utils import OASIS_DATE_FORMAT, OASIS_NAMESPACE
+
+# DATA_ITEMs of PRC_LMP, used as defaults
+LMP_DATA_ITEMS = ["LMP_PRC", "LMP_ENE_PRC", "LMP_CONG_PRC", "LMP_LOSS_PRC"]
+
+# first interval of synthetic reports
+SYNTHETIC_START = datetime(2020, 6, 1, 7, tzinfo=utc)
+
+# timestamp format of OASIS XML reports, with the literal -00:00 offset
+SYNTHETIC_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S-00:00"
+
+ERROR_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<OASISReport xmlns="{namespace}">
+<MessageHeader><TimeDate>{time_date}</TimeDate><Source>OASIS</Source><Version>v20131201</Version></MessageHeader>
+<MessagePayload><RTO><name>CAISO</name>
+<ERROR><ERR_CODE>{err_code}</ERR_CODE><ERR_DESC>{err_desc}</ERR_DESC></ERROR>
+</RTO></MessagePayload></OASISReport>
+"""
+
+
+def synthetic_intervals(
+    start,
+    intervals,
+    interval_length=timedelta(hours=1),
+    timezone_=timezone("US/Pacific"),
+):
+    """
+    Returns the OPR_DATE, INTERVAL_NUM, INTERVAL_START_GMT and
+    INTERVAL_END_GMT strings of consecutive intervals, numbered from 1 within
+    each operating date like OASIS reports.
+
+    :param start: timezone-aware datetime of the first interval
+    :param intervals: number of intervals (int)
+    :param interval_length: (timedelta)
+    :param timezone_: timezone of operating dates (pytz.timezone)
+    :return: list of (opr_date, interval_num, start, end) tuples
+    """
+    start = start.astimezone(utc)
+
+    rows = []
+    opr_date, interval_num = None, 0
+    for i in range(intervals):
+        interval_start = start + i * interval_length
+        interval_end = interval_start + interval_length
+        local_date = interval_start.astimezone(timezone_).strftime(OASIS_DATE_FORMAT)
+        interval_num = interval_num + 1 if local_date == opr_date else 1
+        opr_date = local_date
+        rows.append(
+            (
+                opr_date,
+                str(interval_num),
+                interval_start.strftime(SYNTHETIC_DATETIME_FORMAT),
+                interval_end.strftime(SYNTHETIC_DATETIME_FORMAT),
+            )
+        )
+
+    return rows
+
+
+def iter_synthetic_xml(
+    report_name="PRC_LMP",
+    nodes=10,
+    intervals=24,
+    data_items=LMP_DATA_ITEMS,
+    start=SYNTHETIC_START,
+    interval_length=timedelta(hours=1),
+    market_run_id="DAM",
+    seed=0,
+):
+    """
+    Generates the text of an OASIS XML report with one REPORT_ITEM per node
+    and DATA_ITEM, each holding one REPORT_DATA element per interval, in the
+    layout of PRC_LMP reports. The text is yielded one REPORT_ITEM at a time,
+    so reports of millions of rows can be written without holding them in
+    memory. One node and one DATA_ITEM give a single REPORT_ITEM, and one
+    interval gives single REPORT_DATA elements, the edge cases handled by
+    OASISReport.normalize_report_dict.
+
+    :param report_name: REPORT of the header (string)
+    :param nodes: number of RESOURCE_NAMEs (int), or list of RESOURCE_NAMEs
+    :param intervals: number of intervals per node and DATA_ITEM (int)
+    :param data_items: list of DATA_ITEMs
+    :param start: timezone-aware datetime of the first interval
+    :param interval_length: (timedelta)
+    :param market_run_id: MKT_TYPE of the header (string)
+    :param seed: seed of the random VALUEs (int)
+    :return: generator of strings
+    """
+    if isinstance(nodes, int):
+        nodes = ["NODE_{}-APND".format(x) for x in range(nodes)]
+
+    random_state = np.random.RandomState(seed)
+    interval_rows = synthetic_intervals(start, intervals, interval_length)
+    seconds = int(interval_length.total_seconds())
+
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<OASISReport xmlns="{}">\n'.format(OASIS_NAMESPACE)
+    yield (
+        "<MessageHeader><TimeDate>{}</TimeDate><Source>OASIS</Source>"
+        "<Version>v20131201</Version></MessageHeader>\n".format(
+            start.astimezone(utc).strftime(SYNTHETIC_DATETIME_FORMAT)
+        )
+    )
+    yield "<MessagePayload><RTO><name>CAISO</name>\n"
+
+    header = (
+        "<REPORT_HEADER><SYSTEM>OASIS</SYSTEM><TZ>PPT</TZ>"
+        "<REPORT>{}</REPORT><MKT_TYPE>{}</MKT_TYPE><UOM>US$/MWh</UOM>"
+        "<INTERVAL>ENDING</INTERVAL><SEC_PER_INTERVAL>{}</SEC_PER_INTERVAL>"
+        "</REPORT_HEADER>\n".format(report_name, market_run_id, seconds)
+    )
+    for resource_name in nodes:
+        for data_item in data_items:
+            values = random_state.normal(30, 10, intervals).round(5)
+            yield "<REPORT_ITEM>" + header
+            yield "".join(
+                "<REPORT_DATA><DATA_ITEM>{}</DATA_ITEM>"
+                "<RESOURCE_NAME>{}</RESOURCE_NAME><OPR_DATE>{}</OPR_DATE>"
+                "<INTERVAL_NUM>{}</INTERVAL_NUM>"
+                "<INTERVAL_START_GMT>{}</INTERVAL_START_GMT>"
+                "<INTERVAL_END_GMT>{}</INTERVAL_END_GMT>"
+                "<VALUE>{}</VALUE></REPORT_DATA>\n".format(
+                    data_item, resource_name, *interval_row, value
+                )
+                for interval_row, value in zip(interval_rows, values)
+            )
+            yield "</REPORT_ITEM>\n"
+
+    yield (
+        "<DISCLAIMER_ITEM><DISCLAIMER>Synthetic report generated by pyoasis"
+        "</DISCLAIMER></DISCLAIMER_ITEM>\n"
+    )
+    yield "</RTO></MessagePayload></OASISReport>\n"
+
+
+def synthetic_xml_name(report_name, start, end, market_run_id="DAM"):
+    """
+    Returns an XML file name in the format OASIS uses inside zip files, e.g.
+    "20200601_20200602_PRC_LMP_DAM_20200601_07_00_00_v1.xml".
+    """
+    return "{}_{}_{}_{}_{}_v1.xml".format(
+        start.strftime("%Y%m%d"),
+        end.strftime("%Y%m%d"),
+        report_name,
+        market_run_id,
+        start.astimezone(utc).strftime("%Y%m%d_%H_%M_%S"),
+    )
+
+
+def write_synthetic_xml(path, **report_arguments):
+    """
+    Writes a synthetic OASIS XML report, see iter_synthetic_xml.
+
+    :param path: destination file path (string)
+    :param report_arguments: keyword arguments of iter_synthetic_xml
+    :return: path
+    """
+    with open(path, "w") as f:
+        f.writelines(iter_synthetic_xml(**report_arguments))
+
+    return path
+
+
+def write_synthetic_zip(path, xml_name=None, **report_arguments):
+    """
+    Writes a zip file holding a synthetic OASIS XML report, as returned by
+    OASIS. The report is compressed as it is generated.
+
+    :param path: destination file path, or a writable file-like object
+    :param xml_name: name of the XML file in the zip, defaults to an
+        OASIS-style name
+    :param report_arguments: keyword arguments of iter_synthetic_xml
+    :return: path
+    """
+    if not xml_name:
+        start = report_arguments.get("start", SYNTHETIC_START)
+        end = start + report_arguments.get(
+            "interval_length", timedelta(hours=1)
+        ) * report_arguments.get("intervals", 24)
+        xml_name = synthetic_xml_name(
+            report_arguments.get("report_name", "PRC_LMP"),
+            start,
+            end,
+            report_arguments.get("market_run_id", "DAM"),
+        )
+
+    with ZipFile(path, "w", ZIP_DEFLATED) as zipfile:
+        with zipfile.open(xml_name, "w", force_zip64=True) as f:
+            for text in iter_synthetic_xml(**report_arguments):
+                f.write(text.encode())
+
+    return path
+
+
+def synthetic_zip_bytes(**report_arguments):
+    """
+    Returns the content of a zip file holding a synthetic OASIS XML report.
+
+    :param report_arguments: keyword arguments of write_synthetic_zip
+    :return: bytes
+    """
+    buffer = io.BytesIO()
+    write_synthetic_zip(buffer, **report_arguments)
+
+    return buffer.getvalue()
+
+
+def synthetic_error_xml(
+    err_code="1000", err_desc="No data returned for the specified selection"
+):
+    """
+    Returns the text of an OASIS XML report holding an ERROR instead of data,
+    e.g. "1000" for no data.
+
+    :param err_code: ERR_CODE (string)
+    :param err_desc: ERR_DESC (string)
+    :return: string
+    """
+    return ERROR_XML.format(
+        namespace=OASIS_NAMESPACE,
+        time_date=datetime.now(utc).strftime(SYNTHETIC_DATETIME_FORMAT),
+        err_code=err_code,
+        err_desc=err_desc,
+    )
+
+
+def synthetic_shape(rows, intervals=24, data_items=LMP_DATA_ITEMS):
+    """
+    Returns keyword arguments of iter_synthetic_xml for a report of about
+    rows REPORT_DATA rows, adding nodes for larger reports.
+
+    :param rows: number of rows (int)
+    :param intervals: number of intervals per node and DATA_ITEM (int)
+    :param data_items: list of DATA_ITEMs
+    :return: dictionary
+    """
+    intervals = min(intervals, max(1, rows // len(data_items)))
+    nodes = max(1, int(round(rows / intervals / len(data_items))))
+
+    return {"nodes": nodes, "intervals": intervals, "data_items": data_items}
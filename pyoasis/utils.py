@@ -1,16 +1,85 @@
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from functools import lru_cache
+import glob
 from io import BytesIO
 import json
 import os
+import pandas as pd
 from pytz import timezone
+import re
 import requests
+import threading
 import time
 import xmltodict
 from zipfile import BadZipfile, ZipFile
 
+try:
+    from lxml.etree import iterparse
+except ImportError:
+    from xml.etree.ElementTree import iterparse
 
-# get location of oasis_endpoints.json file
+from .catalog import OASIS_ENDPOINTS_JSON, get_endpoint_catalog  # noqa: F401
+from .metrics import emit, stage
+
+# get location of oasis_schemas.json file
 FILE_DIR = os.path.dirname(os.path.realpath(__file__))
-OASIS_ENDPOINTS_JSON = FILE_DIR + "/oasis_endpoints.json"
+OASIS_SCHEMAS_JSON = FILE_DIR + "/oasis_schemas.json"
+
+# scheme and host of the OASIS API
+OASIS_BASE_URL = "http://oasis.caiso.com"
+
+# seconds between the start of requests when several are sent at once, as
+# OASIS rate limits bursts of requests
+PARALLEL_REQUEST_INTERVAL = 5
+
+# formats of timestamps and operating dates in OASIS XML reports
+OASIS_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+OASIS_DATE_FORMAT = "%Y-%m-%d"
+
+# namespace of OASIS XML reports
+OASIS_NAMESPACE = "http://www.caiso.com/soa/OASISReport_v1.xsd"
+
+# start and end dates leading OASIS XML file names, e.g.
+# "20200601_20200602_PRC_LMP_DAM_20200601_07_00_00_v1.xml"
+OASIS_XML_NAME_PATTERN = re.compile(r"^(\d{8})_(\d{8})_")
+
+# file name of OASIS answers to requests it cannot serve
+INVALID_REQUEST_XML = "INVALID_REQUEST.xml"
+
+# ERR_CODE of reports without data
+NO_DATA_ERROR_CODE = "1000"
+
+# decompressed bytes read from the start of each XML member to find an ERROR
+HEADER_BYTES = 4096
+
+ERROR_PATTERN = re.compile(
+    rb"<(?:\w+:)?ERR_CODE>\s*([^<]*?)\s*</(?:\w+:)?ERR_CODE>"
+    rb"(?:.*?<(?:\w+:)?ERR_DESC>\s*([^<]*?)\s*</(?:\w+:)?ERR_DESC>)?",
+    re.DOTALL,
+)
+
+ReportMetadata = namedtuple(
+    "ReportMetadata",
+    [
+        "path",
+        "report_name",
+        "market_run_id",
+        "start_date",
+        "end_date",
+        "created",
+        "header",
+        "error",
+        "invalid_request",
+    ],
+)
+ReportMetadata.__doc__ = """
+Metadata of an OASIS XML report: the file path, REPORT and MKT_TYPE of the
+first report header, the start and end dates of the file name (None if the
+name does not follow the OASIS format), the MessageHeader TimeDate, the
+first report header as a dictionary, (ERR_CODE, ERR_DESC) of ERROR reports
+or None, and whether the file is an INVALID_REQUEST.xml answer.
+"""
 
 
 def format_datetime(datetime_, timezone_=timezone("US/Pacific")):
@@ -31,7 +100,14 @@ def format_datetime(datetime_, timezone_=timezone("US/Pacific")):
     return datetime_.strftime("%Y%m%dT%H:%M%z")
 
 
-def create_oasis_url(report_name, start=None, end=None, query_params={}):
+def create_oasis_url(
+    report_name,
+    start=None,
+    end=None,
+    query_params={},
+    base_url=OASIS_BASE_URL,
+    validate=True,
+):
     """
     Queries CAISO OASIS for a report and saves the file to the
     destination_directory.
@@ -40,65 +116,221 @@ def create_oasis_url(report_name, start=None, end=None, query_params={}):
     :param start: datetime object
     :param end: datetime object
     :param query_params: additional querystring parameters (dictionary)
+    :param base_url: scheme and host to send the query to, e.g. a local
+        stand-in server
+    :param validate: True to raise ValueError for unknown reports or query
+        params before any request is made, see
+        pyoasis.catalog.EndpointCatalog.validate
     :return: file locations (list)
     """
-    with open(OASIS_ENDPOINTS_JSON) as f:
-        all_endpoints_dict = json.load(f)
+    with stage("create_oasis_url", report_name=report_name):
+        catalog = get_endpoint_catalog()
+        if validate:
+            catalog.validate(report_name, query_params)
+
+        # add path based on oasis_endpoints.json
+        endpoint = catalog.endpoint(report_name)
+        oasis_url = base_url + endpoint.path
+
+        # construct additional paramaters
+        querystring = "&".join([str(x) + "=" + str(y) for x, y in query_params.items()])
+        if start:
+            querystring += "&startdatetime={}".format(format_datetime(start))
+        if end:
+            querystring += "&enddatetime={}".format(format_datetime(end))
 
-    # construct base url
-    oasis_url = "oasis.caiso.com"
+        # add report query
+        querystring += "&" + endpoint.report_query + "=" + report_name
 
-    # add path based on oasis_endpoints.json
-    single_zip_path = "/oasisapi/SingleZip"
-    group_zip_path = "/oasisapi/GroupZip"
-    if report_name in (all_endpoints_dict[oasis_url][single_zip_path].keys()):
-        oasis_url += single_zip_path
-        report_query = "queryname"
-    elif report_name in (all_endpoints_dict[oasis_url][group_zip_path].keys()):
-        oasis_url += group_zip_path
-        report_query = "groupid"
+        return oasis_url + "?" + querystring
 
-    # construct additional paramaters
-    querystring = "&".join([str(x) + "=" + str(y) for x, y in query_params.items()])
-    if start:
-        querystring += "&startdatetime={}".format(format_datetime(start))
-    if end:
-        querystring += "&enddatetime={}".format(format_datetime(end))
 
-    # add report query
-    querystring += "&" + report_query + "=" + report_name
+class RequestThrottle:
+    """
+    Spaces out requests made from any number of threads so that no two
+    requests start less than min_interval seconds apart.
+    """
 
-    return "http://" + oasis_url + "?" + querystring
+    def __init__(self, min_interval=0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_request = 0
 
+    def wait(self):
+        """
+        Blocks until the next request slot is available and claims it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_request - now
+            self._next_request = max(now, self._next_request) + self.min_interval
 
-def download_files(url, destination_directory, max_attempts=1):
+        if delay > 0:
+            time.sleep(delay)
+
+
+def default_request_interval(request_interval, workers):
     """
-    Downloads zipped files from url and saves to destination_directory. Returns
-    a list of absolute file locations.
+    Returns request_interval, or when it is None the spacing to use for
+    workers concurrent requests: PARALLEL_REQUEST_INTERVAL for more than one,
+    otherwise 0.
+
+    :param request_interval: seconds (float) or None
+    :param workers: number of concurrent requests (int)
+    :return: seconds (float)
+    """
+    if request_interval is not None:
+        return request_interval
+
+    return PARALLEL_REQUEST_INTERVAL if workers > 1 else 0
+
+
+def download_zipfile(
+    url, max_attempts=None, throttle=None, client=None, cache=None, refresh=False
+):
+    """
+    Downloads a zipped response from url and returns it as an in-memory
+    ZipFile, without writing anything to disk.
 
     :param url: (string)
-    :param destination_directory: (string)
-    :param max_attempts: maximum attempts to download file (int)
-    :return: absolute paths of all files (list of strings)
+    :param max_attempts: maximum attempts to download file, defaults to 1 or
+        to client.max_attempts when a client is given (int)
+    :param throttle: RequestThrottle used to space out requests
+    :param client: pyoasis.client.OASISClient used for pooled connections and
+        its retry policy, otherwise a bare request is made per attempt
+    :param cache: pyoasis.cache.ChunkCache checked before going to the
+        network and updated with new downloads, except INVALID_REQUEST.xml
+        and ERROR responses, see ChunkCache.put
+    :param refresh: True to download url even when cached, replacing the
+        cached entry, e.g. for data that has been revised since
+    :return: ZipFile
     """
-    destination_directory = os.path.abspath(os.path.expanduser(destination_directory))
+    return ZipFile(
+        BytesIO(download_content(url, max_attempts, throttle, client, cache, refresh))
+    )
 
+
+def download_content(
+    url, max_attempts=None, throttle=None, client=None, cache=None, refresh=False
+):
+    """
+    Downloads a zipped response from url and returns the raw zip file
+    content. See download_zipfile.
+
+    :return: bytes
+    """
+    with stage("download") as fields:
+        content = cache.get(url) if cache and not refresh else None
+        fields["cached"] = content is not None
+        if content is None:
+            if client:
+                content = client.get_content(url, max_attempts, throttle)
+            else:
+                content = _download_content(url, max_attempts or 1, throttle)
+            if cache:
+                cache.put(url, content)
+        fields["bytes"] = len(content)
+
+    return content
+
+
+def _download_content(url, max_attempts, throttle=None):
+    """
+    Downloads url with a bare request per attempt, retrying with a linear
+    back-off until the response is a zip file.
+    """
     i = 1
-    success = False
-    while not success and i <= max_attempts:
+    while True:
+        if throttle:
+            throttle.wait()
         try:
-            # pull data from url and save to destination_directory
             response = requests.get(url)
-            zipfile = ZipFile(BytesIO(response.content))
-            zipfile.extractall(destination_directory)
-            success = True
+            ZipFile(BytesIO(response.content))
+            return response.content
         except BadZipfile as e:
-            if i != max_attempts:
+            if i < max_attempts:
+                emit("retry", attempt=i, reason=type(e).__name__)
                 time.sleep(i)
                 i += 1
             else:
                 raise e
 
+
+def open_zip_members(zipfile):
+    """
+    Yields each member of zipfile as an open file-like object. Each member is
+    closed before the next one is opened.
+
+    :param zipfile: ZipFile
+    :return: generator of file-like objects
+    """
+    for name in zipfile.namelist():
+        with zipfile.open(name) as f:
+            yield f
+
+
+def inspect_zip_content(content):
+    """
+    Inspects a zipped OASIS response in memory. Only member names and the
+    start of each XML member are read, nothing is extracted.
+
+    :param content: zip file content (bytes)
+    :return: tuple of status ("ok", "no_data", "invalid_request" or
+        "error"), list of member names and error description or None
+    """
+    zipfile = ZipFile(BytesIO(content))
+    members = zipfile.namelist()
+
+    if any(x.endswith(INVALID_REQUEST_XML) for x in members):
+        return "invalid_request", members, INVALID_REQUEST_XML
+
+    status, error = "ok", None
+    for name in members:
+        if not name.lower().endswith(".xml"):
+            continue
+        with zipfile.open(name) as f:
+            match = ERROR_PATTERN.search(f.read(HEADER_BYTES))
+        if match:
+            err_code = match.group(1).decode()
+            err_desc = (match.group(2) or b"").decode()
+            if err_code != NO_DATA_ERROR_CODE:
+                return "error", members, "{} {}".format(err_code, err_desc)
+            status, error = "no_data", "{} {}".format(err_code, err_desc)
+
+    return status, members, error
+
+
+def download_files(
+    url,
+    destination_directory,
+    max_attempts=None,
+    throttle=None,
+    client=None,
+    cache=None,
+    refresh=False,
+):
+    """
+    Downloads zipped files from url and saves to destination_directory. Returns
+    a list of absolute file locations.
+
+    :param url: (string)
+    :param destination_directory: (string)
+    :param max_attempts: maximum attempts to download file, defaults to 1 or
+        to client.max_attempts when a client is given (int)
+    :param throttle: RequestThrottle used to space out requests
+    :param client: pyoasis.client.OASISClient used to make the request
+    :param cache: pyoasis.cache.ChunkCache checked before going to the network
+    :param refresh: True to download url even when cached, see
+        download_zipfile
+    :return: absolute paths of all files (list of strings)
+    """
+    destination_directory = os.path.abspath(os.path.expanduser(destination_directory))
+
+    # pull data from url and save to destination_directory
+    zipfile = download_zipfile(url, max_attempts, throttle, client, cache, refresh)
+    with stage("extract"):
+        zipfile.extractall(destination_directory)
+
     # return absolute paths of all files
     return [destination_directory + "/" + x for x in zipfile.namelist()]
 
@@ -107,23 +339,305 @@ def xml_to_dict(xml_path):
     """
     Converts an XML file to a Python dictionary.
 
-    :param xml_path: path to XML file
+    :param xml_path: path to XML file or file-like object
     :return: dictionary
     """
+    if hasattr(xml_path, "read"):
+        return xmltodict.parse(xml_path)
+
     with open(xml_path) as f:
         return xmltodict.parse(f.read())
 
 
+def _local_name(tag):
+    """
+    Strips the namespace from an ElementTree tag.
+    """
+    return tag.rsplit("}", 1)[-1]
+
+
+def _element_to_dict(element):
+    """
+    Converts an ElementTree element to the structure xmltodict would produce
+    for it.
+
+    :param element: ElementTree element
+    :return: string, None or OrderedDict
+    """
+    children = [x for x in element if isinstance(x.tag, str)]
+    text = element.text.strip() if element.text else ""
+
+    if not children and not element.attrib:
+        return text or None
+
+    element_dict = OrderedDict(
+        ("@" + _local_name(x), y) for x, y in element.attrib.items()
+    )
+    for child in children:
+        key = _local_name(child.tag)
+        value = _element_to_dict(child)
+        if key not in element_dict:
+            element_dict[key] = value
+        elif isinstance(element_dict[key], list):
+            element_dict[key].append(value)
+        else:
+            element_dict[key] = [element_dict[key], value]
+    if text:
+        element_dict["#text"] = text
+
+    return element_dict
+
+
+def compile_filters(filters):
+    """
+    Converts row filters to a dictionary of column name to a function of a
+    single raw (string) value returning True for values to keep. Each filter
+    is one of:
+
+        - a value or a collection of values, e.g. a set of node names
+        - a compiled regular expression, matched anywhere in the value
+        - a function of the value returning True or False
+
+    :param filters: dictionary of column name to filter, or None
+    :return: dictionary of column name to function
+    """
+    compiled = {}
+    for column, filter_ in (filters or {}).items():
+        if isinstance(filter_, re.Pattern):
+            compiled[column] = (
+                lambda x, pattern=filter_: x is not None
+                and pattern.search(x) is not None
+            )
+        elif callable(filter_):
+            compiled[column] = filter_
+        elif isinstance(filter_, str) or not hasattr(filter_, "__iter__"):
+            compiled[column] = lambda x, value=filter_: x == value
+        else:
+            compiled[column] = lambda x, values=frozenset(filter_): x in values
+
+    return compiled
+
+
+def filter_data(data_list, filters=None, columns=None):
+    """
+    Keeps the DATA dictionaries of an xmltodict report that match all filters
+    and drops keys not in columns.
+
+    :param data_list: list of DATA dictionaries
+    :param filters: dictionary of column name to filter, see compile_filters
+    :param columns: column names to keep, or None for all columns
+    :return: list of DATA dictionaries
+    """
+    filters = compile_filters(filters)
+    data_list = [x for x in data_list if all(y(x.get(z)) for z, y in filters.items())]
+    if columns is not None:
+        data_list = [
+            OrderedDict((y, z) for y, z in x.items() if y in columns) for x in data_list
+        ]
+
+    return data_list
+
+
+def iterparse_xml(xml_path, filters=None, columns=None):
+    """
+    Incrementally parses an OASIS XML report. DATA elements are read into
+    columnar lists and removed from the tree as soon as they are consumed, so
+    the full document is never held in memory. All other elements are
+    returned as an xmltodict-style skeleton of the report, with the ITEM
+    level nested in a list and an empty DATA list in every item.
+
+    Rows failing filters and values of columns not in columns are dropped as
+    each DATA element is read, so memory tracks the size of the result.
+
+    :param xml_path: path to XML file or file-like object
+    :param filters: dictionary of column name to filter, see compile_filters
+    :param columns: column names to keep, or None for all columns
+    :return: skeleton report dictionary, OrderedDict of column values, list
+        of the number of rows kept from each item
+    """
+    filters = compile_filters(filters)
+    columns_to_keep = columns
+    columns = OrderedDict()
+    num_rows = 0
+    item_sizes = []
+    last_row = 0
+    keys = None
+    stack = []
+
+    for event, element in iterparse(xml_path, events=("start", "end")):
+        if event == "start":
+            stack.append(element)
+            continue
+        stack.pop()
+
+        if not isinstance(element.tag, str) or len(stack) not in (3, 4):
+            continue
+
+        key_path = [_local_name(x.tag) for x in stack[1:]] + [_local_name(element.tag)]
+        if (
+            "MessagePayload" not in key_path[0]
+            or "RTO" not in key_path[1]
+            or "ITEM" not in key_path[2]
+            or key_path[2] == "DISCLAIMER_ITEM"
+        ):
+            continue
+
+        # end of ITEM, count its rows
+        if len(stack) == 3:
+            item_sizes.append(num_rows - last_row)
+            last_row = num_rows
+            continue
+
+        if "DATA" not in key_path[3]:
+            continue
+        keys = key_path
+
+        # read DATA children into columns, skipping filtered out rows
+        row = OrderedDict()
+        for child in element:
+            if isinstance(child.tag, str):
+                value = child.text.strip() if child.text else None
+                row[_local_name(child.tag)] = value or None
+        if all(y(row.get(x)) for x, y in filters.items()):
+            if columns_to_keep is not None:
+                row = OrderedDict(
+                    (x, y) for x, y in row.items() if x in columns_to_keep
+                )
+            for column, values in columns.items():
+                values.append(row.pop(column, None))
+            for column, value in row.items():
+                columns[column] = [None] * num_rows + [value]
+            num_rows += 1
+
+        # drop consumed DATA element
+        element.clear()
+        stack[-1].remove(element)
+
+    root = element
+    report_dict = OrderedDict([(_local_name(root.tag), _element_to_dict(root))])
+
+    # nest items in a list and add an empty DATA list to each item
+    if keys:
+        payload_key, rto_key, item_key, data_key = keys
+        rto_dict = report_dict[_local_name(root.tag)][payload_key][rto_key]
+        items = rto_dict[item_key]
+        if not isinstance(items, list):
+            items = [items]
+        rto_dict[item_key] = [
+            OrderedDict(list((x or {}).items()) + [(data_key, [])]) for x in items
+        ]
+
+    return report_dict, columns, item_sizes
+
+
+def report_metadata(path, created=None, header=None, error=None):
+    """
+    Builds the ReportMetadata of a report from its MessageHeader TimeDate,
+    first report header and error.
+
+    :param path: path or name of the XML file (string)
+    :param created: MessageHeader TimeDate (string)
+    :param header: dictionary of report header fields
+    :param error: (ERR_CODE, ERR_DESC) or None
+    :return: ReportMetadata
+    """
+    header = header or {}
+    name = os.path.basename(str(path))
+    match = OASIS_XML_NAME_PATTERN.match(name)
+    start_date, end_date = (
+        [datetime.strptime(x, "%Y%m%d").date() for x in match.groups()]
+        if match
+        else (None, None)
+    )
+
+    return ReportMetadata(
+        path=path,
+        report_name=header.get("REPORT"),
+        market_run_id=header.get("MKT_TYPE"),
+        start_date=start_date,
+        end_date=end_date,
+        created=created,
+        header=header,
+        error=error,
+        invalid_request=name == INVALID_REQUEST_XML,
+    )
+
+
+def read_report_metadata(xml_path):
+    """
+    Reads the metadata of an OASIS XML report without parsing its DATA
+    elements. Parsing stops at the first DATA element or at the ERROR
+    element, so only the first few kilobytes of the file are read whatever
+    its size. A file-like object is returned to where it started when it
+    supports seek.
+
+    :param xml_path: path to XML file or file-like object
+    :return: ReportMetadata
+    """
+    position = xml_path.tell() if hasattr(xml_path, "seek") else None
+    created = None
+    header = None
+    error = None
+    depth = 0
+
+    try:
+        for event, element in iterparse(xml_path, events=("start", "end")):
+            if not isinstance(element.tag, str):
+                continue
+            name = _local_name(element.tag)
+            if event == "start":
+                depth += 1
+                # DATA elements follow the report header of an ITEM
+                if depth == 5 and "DATA" in name:
+                    break
+                continue
+            depth -= 1
+
+            if name == "TimeDate" and created is None:
+                created = element.text
+            elif name.endswith("HEADER") and header is None and depth == 4:
+                header = OrderedDict(
+                    (_local_name(x.tag), x.text)
+                    for x in element
+                    if isinstance(x.tag, str)
+                )
+            elif name == "ERROR" and depth == 3:
+                error = OrderedDict(
+                    (_local_name(x.tag), x.text)
+                    for x in element
+                    if isinstance(x.tag, str)
+                )
+                error = error.get("ERR_CODE"), error.get("ERR_DESC")
+                break
+    finally:
+        if position is not None:
+            xml_path.seek(position)
+
+    return report_metadata(getattr(xml_path, "name", xml_path), created, header, error)
+
+
+def scan_reports(directory, pattern="**/*.xml"):
+    """
+    Reads the metadata of every OASIS XML report in directory, see
+    read_report_metadata.
+
+    :param directory: directory to scan (string)
+    :param pattern: glob pattern of the files, relative to directory
+    :return: pandas.DataFrame with one row of ReportMetadata fields per
+        file, sorted by path
+    """
+    paths = sorted(glob.glob(os.path.join(directory, pattern), recursive=True))
+
+    return pd.DataFrame(
+        [read_report_metadata(x) for x in paths], columns=ReportMetadata._fields
+    )
+
+
 def get_report_names():
     """
     Returns all possible report names.
     """
-    with open(OASIS_ENDPOINTS_JSON) as f:
-        all_endpoints_dict = json.load(f)
-
-    return set(
-        all_endpoints_dict["oasis.caiso.com"]["/oasisapi/GroupZip"].keys()
-    ) | set(all_endpoints_dict["oasis.caiso.com"]["/oasisapi/SingleZip"].keys())
+    return get_endpoint_catalog().report_names()
 
 
 def get_report_params(report_name):
@@ -131,16 +645,66 @@ def get_report_params(report_name):
     Filters oasis_endpoints.json file and returns sample params for a report
     query harvested from the API docs.
     """
-    with open(OASIS_ENDPOINTS_JSON) as f:
-        all_endpoints_dict = json.load(f)
-
-    for domain, domain_dict in all_endpoints_dict.items():
-        for path, path_dict in domain_dict.items():
-            if report_name in path_dict.keys():
-                return {
-                    domain: {
-                        path: {
-                            report_name: all_endpoints_dict[domain][path][report_name]
-                        }
-                    }
-                }
+    catalog = get_endpoint_catalog()
+    if report_name in catalog:
+        return catalog.report_params(report_name)
+
+
+@lru_cache(maxsize=None)
+def load_report_schemas():
+    """
+    Returns the contents of oasis_schemas.json, loaded once per process.
+    Treat as read-only, see get_report_schema.
+
+    :return: dictionary
+    """
+    with open(OASIS_SCHEMAS_JSON) as f:
+        return json.load(f)
+
+
+def get_report_schema(report_name):
+    """
+    Returns the column dtypes of a report from oasis_schemas.json: the
+    default schema updated with any report-specific columns.
+
+    Dtypes are pandas dtype names, plus "datetime" for OASIS GMT timestamps
+    and "date" for operating dates.
+
+    :param report_name: (string)
+    :return: dictionary of column name to dtype
+    """
+    all_schemas_dict = load_report_schemas()
+
+    schema = dict(all_schemas_dict["default"])
+    schema.update(all_schemas_dict["reports"].get(report_name, {}))
+
+    return schema
+
+
+def apply_report_schema(report_dataframe, schema):
+    """
+    Converts the string columns of a parsed report to typed columns. Columns
+    missing from schema, or from report_dataframe, are left untouched.
+
+    :param report_dataframe: DataFrame of strings
+    :param schema: dictionary of column name to dtype, see get_report_schema
+    :return: DataFrame
+    """
+    columns = {}
+    for column, dtype in schema.items():
+        if column not in report_dataframe.columns:
+            continue
+
+        values = report_dataframe[column]
+        if dtype == "datetime":
+            columns[column] = pd.to_datetime(
+                values, format=OASIS_DATETIME_FORMAT, utc=True
+            )
+        elif dtype == "date":
+            columns[column] = pd.to_datetime(values, format=OASIS_DATE_FORMAT)
+        elif dtype == "category":
+            columns[column] = values.astype("category")
+        else:
+            columns[column] = pd.to_numeric(values).astype(dtype)
+
+    return report_dataframe.assign(**columns)
@@ -0,0 +1,414 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+import io
+import itertools
+import numpy as np
+import pandas as pd
+from xml.sax.saxutils import escape, quoteattr
+import xmltodict
+
+from .utils import OASIS_NAMESPACE
+
+# UTC offset and format of GMT timestamps in OASIS XML reports
+XML_UTC_OFFSET = "-00:00"
+XML_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S" + XML_UTC_OFFSET
+
+# columns whose consecutive runs of equal values form one ITEM when a
+# DataFrame is written without item sizes
+ITEM_COLUMNS = ["DATA_ITEM", "RESOURCE_NAME"]
+
+# DataFrame rows formatted at a time
+BATCH_SIZE = 10000
+
+# text buffered before each write to the destination
+WRITE_BUFFER_SIZE = 1024**2
+
+
+def report_skeleton(report_name=None):
+    """
+    Returns a minimal OASIS report dictionary without DATA, for writing
+    DataFrames that were not read from a report.
+
+    :param report_name: REPORT of the item header, if any
+    :return: OrderedDict
+    """
+    header = OrderedDict([("SYSTEM", "OASIS"), ("TZ", "PPT")])
+    if report_name:
+        header["REPORT"] = report_name
+
+    return OrderedDict(
+        [
+            (
+                "OASISReport",
+                OrderedDict(
+                    [
+                        ("@xmlns", OASIS_NAMESPACE),
+                        (
+                            "MessageHeader",
+                            OrderedDict(
+                                [
+                                    (
+                                        "TimeDate",
+                                        datetime.now(timezone.utc).strftime(
+                                            XML_DATETIME_FORMAT
+                                        ),
+                                    ),
+                                    ("Source", "OASIS"),
+                                ]
+                            ),
+                        ),
+                        (
+                            "MessagePayload",
+                            OrderedDict(
+                                [
+                                    (
+                                        "RTO",
+                                        OrderedDict(
+                                            [
+                                                ("name", "CAISO"),
+                                                (
+                                                    "REPORT_ITEM",
+                                                    [
+                                                        OrderedDict(
+                                                            [
+                                                                (
+                                                                    "REPORT_HEADER",
+                                                                    header,
+                                                                ),
+                                                                ("REPORT_DATA", []),
+                                                            ]
+                                                        )
+                                                    ],
+                                                ),
+                                            ]
+                                        ),
+                                    )
+                                ]
+                            ),
+                        ),
+                    ]
+                ),
+            )
+        ]
+    )
+
+
+def report_keys(report_dict):
+    """
+    Returns the keys of report_dict at the master, MessagePayload, RTO, ITEM
+    and DATA levels, like the key properties of OASISReport.
+
+    :param report_dict: report dictionary
+    :return: tuple of five strings, item and data keys None if missing
+    """
+    master_key = next(iter(report_dict))
+    payload_key = next(x for x in report_dict[master_key] if "MessagePayload" in x)
+    rto_key = next(x for x in report_dict[master_key][payload_key] if "RTO" in x)
+    rto = report_dict[master_key][payload_key][rto_key]
+    item_key = next(
+        (x for x in rto if "ITEM" in x and x != "DISCLAIMER_ITEM"),
+        None,
+    )
+
+    data_key = None
+    if item_key:
+        item = _as_list(rto[item_key])[0] or {}
+        data_key = next((x for x in item if "DATA" in x), None)
+
+    return master_key, payload_key, rto_key, item_key, data_key
+
+
+def iter_report_xml(report_dict, items):
+    """
+    Generates the text of an OASIS XML report: every element of report_dict
+    except its ITEM elements, which are replaced by the texts of items.
+
+    :param report_dict: report dictionary, e.g. OASISReport.report_dict
+    :param items: iterable of iterables of ITEM text, see dict_items and
+        dataframe_items
+    :return: generator of strings
+    """
+    master_key, payload_key, rto_key, item_key, _ = report_keys(report_dict)
+
+    # skeletons from iterparse_xml drop the xmlns attribute
+    master = report_dict[master_key]
+    if master_key == "OASISReport" and "@xmlns" not in master:
+        master = OrderedDict([("@xmlns", OASIS_NAMESPACE)] + list(master.items()))
+
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield from _iter_element(
+        master_key,
+        master,
+        [payload_key, rto_key, item_key],
+        items,
+    )
+
+
+def dict_items(report_dict, selected=None):
+    """
+    Generates the ITEM texts of report_dict with their DATA as stored, e.g.
+    the original strings of a report read with xmltodict.
+
+    :param report_dict: normalized report dictionary with DATA
+    :param selected: boolean array over all DATA elements in order, or None
+        for all; items without any selected DATA are left out
+    :return: generator of generators of strings
+    """
+    master_key, payload_key, rto_key, item_key, data_key = report_keys(report_dict)
+    if not item_key:
+        return
+
+    row = 0
+    for item in _as_list(report_dict[master_key][payload_key][rto_key][item_key]):
+        data_list = _as_list(item.get(data_key, []))
+        if selected is not None:
+            size = len(data_list)
+            data_list = [x for x, y in zip(data_list, selected[row : row + size]) if y]
+            row += size
+        if not data_list:
+            continue
+
+        yield _iter_item(
+            item_key,
+            item,
+            data_key,
+            (_data_text(data_key, x) for x in data_list),
+        )
+
+
+def dataframe_items(
+    report_dataframe,
+    report_dict,
+    item_sizes=None,
+    item_columns=ITEM_COLUMNS,
+    batch_size=BATCH_SIZE,
+):
+    """
+    Generates ITEM texts holding the rows of report_dataframe. Typed columns
+    are written back in the OASIS formats, and missing values are left out.
+
+    :param report_dataframe: DataFrame of DATA rows
+    :param report_dict: report dictionary the ITEM headers are taken from
+    :param item_sizes: number of rows of each ITEM of report_dict in order,
+        or None to start a new ITEM wherever item_columns change, each with
+        the header of the first ITEM of report_dict
+    :param item_columns: see item_sizes
+    :param batch_size: rows formatted at a time (int)
+    :return: generator of generators of strings
+    """
+    master_key, payload_key, rto_key, item_key, data_key = report_keys(report_dict)
+    items = _as_list(report_dict[master_key][payload_key][rto_key][item_key])
+    data_key = data_key or "REPORT_DATA"
+
+    if item_sizes is None:
+        item_sizes = _run_lengths(report_dataframe, item_columns)
+        items = [items[0]] * len(item_sizes)
+
+    # rows are formatted in batches across items, each item takes its rows
+    rows = _iter_dataframe_rows(report_dataframe, data_key, batch_size)
+    for item, size in zip(items, item_sizes):
+        if size:
+            yield _iter_item(item_key, item, data_key, itertools.islice(rows, size))
+
+
+def write_text(destination, texts, buffer_size=WRITE_BUFFER_SIZE):
+    """
+    Writes texts to destination, buffering up to buffer_size characters per
+    write.
+
+    :param destination: file path, text file-like object or binary
+        file-like object such as socket.makefile("wb")
+    :param texts: iterable of strings
+    :param buffer_size: (int)
+    """
+    if not hasattr(destination, "write"):
+        with open(destination, "w", encoding="utf-8") as f:
+            return write_text(f, texts, buffer_size)
+
+    binary = not isinstance(destination, io.TextIOBase)
+    buffer, buffered = [], 0
+    for text in texts:
+        buffer.append(text)
+        buffered += len(text)
+        if buffered >= buffer_size:
+            text = "".join(buffer)
+            destination.write(text.encode() if binary else text)
+            buffer, buffered = [], 0
+
+    text = "".join(buffer)
+    destination.write(text.encode() if binary else text)
+
+
+def write_report_xml(
+    destination,
+    report_dataframe,
+    report_dict=None,
+    report_name=None,
+    item_sizes=None,
+    item_columns=ITEM_COLUMNS,
+):
+    """
+    Streams report_dataframe to destination as an OASIS XML report, a batch
+    of rows at a time, so memory does not grow with the size of the report.
+
+    :param destination: file path or file-like object, see write_text
+    :param report_dataframe: DataFrame of DATA rows, e.g. the output of
+        fetch_report or OASISReport.report_dataframe
+    :param report_dict: report dictionary whose elements other than DATA
+        are written around the rows, or None for a minimal OASIS report
+    :param report_name: REPORT of the header when report_dict is None
+    :param item_sizes: see dataframe_items
+    :param item_columns: see dataframe_items
+    """
+    report_dict = report_dict or report_skeleton(report_name)
+
+    write_text(
+        destination,
+        iter_report_xml(
+            report_dict,
+            dataframe_items(report_dataframe, report_dict, item_sizes, item_columns),
+        ),
+    )
+
+
+def _iter_element(key, node, path, items):
+    """
+    Generates the text of element key, descending along path to the ITEM
+    elements, which are replaced by items.
+    """
+    yield _start_tag(key, node) + "\n"
+    for child_key, child in _children(node):
+        if child_key != path[0]:
+            yield _fragment(child_key, child)
+        elif len(path) > 1:
+            yield from _iter_element(child_key, child, path[1:], items)
+        else:
+            for item in items:
+                yield from item
+    yield "</{}>\n".format(key)
+
+
+def _iter_item(item_key, item, data_key, data_texts):
+    """
+    Generates the text of an ITEM: its elements other than DATA, then
+    data_texts.
+    """
+    yield _start_tag(item_key, item)
+    for child_key, child in _children(item):
+        if child_key != data_key:
+            yield _fragment(child_key, child)
+    yield from data_texts
+    yield "</{}>\n".format(item_key)
+
+
+def _iter_dataframe_rows(report_dataframe, data_key, batch_size):
+    """
+    Generates the DATA element text of each report_dataframe row, formatting
+    batch_size rows at a time.
+    """
+    start_tag, end_tag = "<{}>".format(data_key), "</{}>\n".format(data_key)
+    for start in range(0, len(report_dataframe), batch_size):
+        batch = report_dataframe.iloc[start : start + batch_size]
+        elements = [_format_elements(column, batch[column]) for column in batch.columns]
+        for row in zip(*elements):
+            yield start_tag + "".join(row) + end_tag
+
+
+def _format_elements(column, values):
+    """
+    Returns the elements of a column as text, empty where values are missing.
+    """
+    start_tag, end_tag = "<{}>".format(column), "</{}>".format(column)
+
+    return [
+        "" if x is None else start_tag + x + end_tag for x in _format_values(values)
+    ]
+
+
+def _format_values(values):
+    """
+    Returns the values of a column as escaped OASIS strings, None where
+    missing. Categories are formatted once rather than per value.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = _format_values(pd.Series(values.cat.categories))
+        return [None if x < 0 else categories[x] for x in values.cat.codes.tolist()]
+
+    missing = values.isna().to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(values):
+        unit, suffix = "s", XML_UTC_OFFSET
+        if values.dt.tz is not None:
+            values = values.dt.tz_convert("UTC").dt.tz_localize(None)
+        elif (values.dropna() == values.dropna().dt.normalize()).all():
+            # naive dates, e.g. OPR_DATE
+            unit, suffix = "D", ""
+        values = np.datetime_as_string(values.to_numpy(), unit=unit)
+        return [None if y else x + suffix for x, y in zip(values.tolist(), missing)]
+
+    if pd.api.types.is_numeric_dtype(values):
+        return [None if y else str(x) for x, y in zip(values.tolist(), missing)]
+
+    return [None if y else escape(str(x)) for x, y in zip(values.tolist(), missing)]
+
+
+def _data_text(data_key, data):
+    """
+    Returns the text of a DATA element stored as a dictionary.
+    """
+    return "<{0}>{1}</{0}>\n".format(
+        data_key,
+        "".join(
+            "<{0}>{1}</{0}>".format(x, escape(y))
+            for x, y in data.items()
+            if y is not None
+        ),
+    )
+
+
+def _start_tag(key, node):
+    attributes = ""
+    if isinstance(node, dict):
+        attributes = "".join(
+            " {}={}".format(x[1:], quoteattr(str(y)))
+            for x, y in node.items()
+            if x.startswith("@")
+        )
+
+    return "<{}{}>".format(key, attributes)
+
+
+def _children(node):
+    if not isinstance(node, dict):
+        return []
+
+    return [(x, y) for x, y in node.items() if not x.startswith("@") and x != "#text"]
+
+
+def _fragment(key, value):
+    """
+    Returns the text of an element stored as xmltodict values.
+    """
+    return xmltodict.unparse({key: value}, full_document=False) + "\n"
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _run_lengths(report_dataframe, columns):
+    """
+    Returns the lengths of consecutive runs of rows with equal values in
+    columns.
+    """
+    columns = [x for x in columns if x in report_dataframe.columns]
+    if report_dataframe.empty:
+        return []
+    if not columns:
+        return [len(report_dataframe)]
+
+    keys = report_dataframe[columns].astype(str)
+    starts = (keys != keys.shift()).any(axis=1).to_numpy().nonzero()[0]
+
+    return list(pd.Series(starts).diff().dropna().astype(int)) + [
+        len(report_dataframe) - starts[-1]
+    ]
@@ -10,6 +10,7 @@ setup(
     license="N/A",
     packages=find_packages(),
     install_requires=["cached-property", "pandas", "requests", "xmltodict"],
+    extras_require={"async": ["aiohttp"], "parquet": ["pyarrow"]},
     package_data={"": ["*.json", "*.txt"]},
     zip_safe=False,
 )
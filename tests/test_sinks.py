@@ -0,0 +1,38 @@
+import pandas as pd
+
+from pyoasis.sinks import ParquetSink
+
+
+def load_dataframe(values):
+    """
+    Returns a load-style chunk keyed by TAC_AREA_NAME, with one row per value.
+    """
+    return pd.DataFrame(
+        {
+            "TAC_AREA_NAME": ["PGE-TAC", "SCE-TAC", "PGE-TAC"][: len(values)],
+            "OPR_DATE": ["2020-06-01"] * len(values),
+            "INTERVAL_START_GMT": ["2020-06-01T07:00:00-00:00"] * len(values),
+            "VALUE": values,
+        }
+    )
+
+
+def test_merge_dedupes_the_first_write(tmp_path):
+    sink = ParquetSink(str(tmp_path))
+    sink.merge("SLD_FCST", load_dataframe(["1.0", "2.0", "3.0"]))
+
+    report_dataframe = pd.read_parquet(str(tmp_path / "REPORT=SLD_FCST"))
+
+    assert len(report_dataframe) == 2
+    assert set(report_dataframe["VALUE"]) == {"2.0", "3.0"}
+
+
+def test_merge_replaces_rows_with_the_same_key(tmp_path):
+    sink = ParquetSink(str(tmp_path))
+    sink.merge("SLD_FCST", load_dataframe(["1.0", "2.0"]))
+    sink.merge("SLD_FCST", load_dataframe(["3.0", "4.0"]))
+
+    report_dataframe = pd.read_parquet(str(tmp_path / "REPORT=SLD_FCST"))
+
+    assert len(report_dataframe) == 2
+    assert set(report_dataframe["VALUE"]) == {"3.0", "4.0"}
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from pyoasis.store import ReportStore
+
+
+def prc_as_dataframe(value):
+    """
+    Returns a PRC_AS-style chunk: rows keyed by ANC_TYPE and ANC_REGION,
+    without a RESOURCE_NAME column.
+    """
+    return pd.DataFrame(
+        {
+            "DATA_ITEM": ["AS_PRC"] * 4,
+            "ANC_TYPE": ["RU", "RD", "RU", "RD"],
+            "ANC_REGION": ["AS_CAISO_EXP", "AS_CAISO_EXP", "AS_SP26", "AS_SP26"],
+            "OPR_DATE": ["2020-06-01"] * 4,
+            "INTERVAL_START_GMT": ["2020-06-01T07:00:00-00:00"] * 4,
+            "INTERVAL_END_GMT": ["2020-06-01T08:00:00-00:00"] * 4,
+            "VALUE": [value] * 4,
+        }
+    )
+
+
+def test_write_twice_keeps_rows_without_resource_name(tmp_path):
+    store = ReportStore(str(tmp_path))
+    store.write("PRC_AS", prc_as_dataframe("1.0"))
+    store.write("PRC_AS", prc_as_dataframe("2.0"))
+
+    report_dataframe = store.read("PRC_AS")
+
+    assert len(report_dataframe) == 4
+    assert set(report_dataframe["VALUE"]) == {"2.0"}
+
+
+def test_write_missing_key_column_raises(tmp_path):
+    store = ReportStore(
+        str(tmp_path),
+        key_columns=["DATA_ITEM", "RESOURCE_NAME", "INTERVAL_START_GMT"],
+    )
+
+    with pytest.raises(ValueError):
+        store.write("PRC_AS", prc_as_dataframe("1.0"))